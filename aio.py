@@ -0,0 +1,239 @@
+#----------------------------------------------------------------------------#
+# Async read path (ASYNC_READS=1).
+#
+# The read routes (venue/artist/show listings, the detail pages and search)
+# are swapped for async views whose queries run on SQLAlchemy's asyncio
+# engine: aiosqlite for SQLite, asyncpg for PostgreSQL, or whatever
+# ASYNC_DATABASE_URL names. Its pool is bounded by ASYNC_POOL_SIZE +
+# ASYNC_MAX_OVERFLOW connections. Writes stay on the sync views and
+# db.session.
+#
+# Async pool connections belong to the event loop that opened them, while
+# Flask runs each async view on whatever loop it finds (a fresh one per
+# request under a WSGI server, the server's loop under asgi.py). So the
+# engine gets a loop of its own, in a thread started per process on first
+# use, and views await their queries there through AsyncDB.run(). run()
+# hands the function a Session running on the async connection, so the
+# model helpers serve both paths. Flask still gives every request a thread
+# that waits on its view, so this doesn't raise throughput (see asgi.py).
+#----------------------------------------------------------------------------#
+import asyncio
+import atexit
+import logging
+import os
+import threading
+
+from flask import abort, current_app, jsonify, render_template, request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import search
+from app import artists_page_args, parse_date
+from cache import cache, conditional
+from models import Venue, Artist, Show
+
+logger = logging.getLogger(__name__)
+
+# backend -> async driver
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+
+def async_url(url):
+    """The async driver's URL for a sync database URL."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError('no async driver for %s; set ASYNC_DATABASE_URL' % backend)
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+class AsyncDB:
+
+    def __init__(self):
+        self.engine = None
+        self.loop = None
+        self.pid = None
+        self.start_lock = threading.Lock()
+
+    def init_app(self, app):
+        try:
+            import asgiref  # noqa: F401
+        except ImportError:
+            raise RuntimeError('ASYNC_READS needs async views: pip install "flask[async]"')
+        url = make_url(app.config.get('ASYNC_DATABASE_URI') or
+                       async_url(app.config['SQLALCHEMY_DATABASE_URI']))
+        options = {'pool_pre_ping': app.config.get('ASYNC_POOL_PRE_PING', True)}
+        if url.get_backend_name() != 'sqlite' or url.database not in (None, '', ':memory:'):
+            options.update({'pool_size': app.config.get('ASYNC_POOL_SIZE', 10),
+                            'max_overflow': app.config.get('ASYNC_MAX_OVERFLOW', 0),
+                            'pool_timeout': app.config.get('ASYNC_POOL_TIMEOUT', 30)})
+        timeout = app.config.get('DB_STATEMENT_TIMEOUT')
+        if url.drivername == 'postgresql+asyncpg' and timeout:
+            options['connect_args'] = {'server_settings': {'statement_timeout': str(timeout)}}
+        # Created here so a missing driver fails at startup, not on the
+        # first request.
+        self.engine = create_async_engine(url, **options)
+        app.extensions['aio'] = self
+        atexit.register(self.shutdown)
+
+    def _start(self):
+        # Like the job workers: the loop thread would not survive a fork.
+        with self.start_lock:
+            if self.pid == os.getpid():
+                return
+            if self.pid is not None:
+                # Forked: drop the parent's connections without closing them.
+                self.engine.sync_engine.dispose(close=False)
+            self.loop = asyncio.new_event_loop()
+            threading.Thread(target=self.loop.run_forever, name='aio-db',
+                             daemon=True).start()
+            self.pid = os.getpid()
+
+    async def _run(self, fn, args, kwargs):
+        async with AsyncSession(self.engine) as session:
+            return await session.run_sync(lambda s: fn(*args, session=s, **kwargs))
+
+    async def run(self, fn, *args, **kwargs):
+        """Await fn(*args, session=<Session>, **kwargs) on the async engine.
+        Whatever fn returns outlives the session, so it should return plain
+        data rather than ORM objects."""
+        if self.pid != os.getpid():
+            self._start()
+        future = asyncio.run_coroutine_threadsafe(self._run(fn, args, kwargs), self.loop)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, timeout=5):
+        if self.pid != os.getpid():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.engine.dispose(), self.loop).result(timeout)
+        except Exception:
+            logger.warning('async engine did not close cleanly', exc_info=True)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.pid = None
+
+
+aio = AsyncDB()
+
+
+#----------------------------------------------------------------------------#
+# Read helpers, run on the async engine's loop (no app context there).
+#----------------------------------------------------------------------------#
+
+def entity_details(model, entity_id, session):
+    obj = session.get(model, entity_id)
+    return None if obj is None else obj.srlz_shows_details
+
+
+def shows_in_window(when, start, end, session):
+    return [s.srlz_artist_venue for s in Show.query_artist_venue(session).filter(
+        *Show.window(when, start, end)).order_by(Show.start_time)]
+
+
+def search_results(model, term, limit, session):
+    return [obj.srlz for obj in search.search(model, term, limit, session=session)]
+
+
+#----------------------------------------------------------------------------#
+# Views; same templates, cache keys and tags as their sync versions in app.py.
+#----------------------------------------------------------------------------#
+
+@cache.cached('venues')
+async def venues():
+    data = await aio.run(Venue.srlz_areas, request.args.get('genre'))
+    return render_template('pages/venues.html', areas=data)
+
+
+async def search_venues():
+    search_term = request.form.get('search_term', '')
+    data = await aio.run(search_results, Venue, search_term,
+                         current_app.config['SEARCH_RESULT_LIMIT'])
+    return render_template('pages/search_venues.html',
+                           results={'count': len(data), 'data': data},
+                           search_term=search_term)
+
+
+async def venue_version(venue_id):
+    return await aio.run(Venue.version, venue_id)
+
+
+@conditional(venue_version)
+@cache.cached('venue:{venue_id}')
+async def show_venue(venue_id):
+    data = await aio.run(entity_details, Venue, venue_id)
+    if data is None:
+        abort(404)
+    cache.tag(*{'artist:%s' % s['artist_id']
+                for s in data['upcoming_shows'] + data['past_shows']})
+    return render_template('pages/show_venue.html', venue=data)
+
+
+async def artists_page():
+    after_id, limit, genre = artists_page_args()
+    return await aio.run(Artist.srlz_page, after_id, limit, genre), limit
+
+
+@cache.cached('artists')
+async def artists():
+    data, limit = await artists_page()
+    return render_template('pages/artists.html', artists=data['artists'],
+                           next_id=data['next_id'], limit=limit,
+                           genre=request.args.get('genre'))
+
+
+@cache.cached('artists')
+async def artists_json():
+    data, _ = await artists_page()
+    return jsonify(data)
+
+
+async def search_artists():
+    search_term = request.form.get('search_term', '')
+    data = await aio.run(search_results, Artist, search_term,
+                         current_app.config['SEARCH_RESULT_LIMIT'])
+    return render_template('pages/search_artists.html',
+                           results={'count': len(data), 'data': data},
+                           search_term=search_term)
+
+
+async def artist_version(artist_id):
+    return await aio.run(Artist.version, artist_id)
+
+
+@conditional(artist_version)
+@cache.cached('artist:{artist_id}')
+async def show_artist(artist_id):
+    data = await aio.run(entity_details, Artist, artist_id)
+    if data is None:
+        abort(404)
+    cache.tag(*{'venue:%s' % s['venue_id']
+                for s in data['upcoming_shows'] + data['past_shows']})
+    return render_template('pages/show_artist.html', artist=data)
+
+
+@cache.cached('shows', 'venues', 'artists')
+async def shows():
+    when = request.args.get('when', 'upcoming')
+    if when not in ('upcoming', 'past', 'all'):
+        abort(400)
+    start = request.args.get('from', None, type=parse_date)
+    end = request.args.get('to', None, type=parse_date)
+    # The rows come back from another thread in one piece, so unlike the
+    # sync view this one renders rather than streams.
+    data = await aio.run(shows_in_window, when, start, end)
+    return render_template('pages/shows.html', shows=data, when=when)
+
+
+VIEWS = {'main.venues': venues,
+         'main.search_venues': search_venues,
+         'main.show_venue': show_venue,
+         'main.artists': artists,
+         'main.artists_json': artists_json,
+         'main.search_artists': search_artists,
+         'main.show_artist': show_artist,
+         'main.shows': shows}
+
+
+def init_app(app):
+    aio.init_app(app)
+    app.view_functions.update(VIEWS)
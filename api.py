@@ -0,0 +1,258 @@
+#----------------------------------------------------------------------------#
+# JSON read API, version 1.
+#
+#   GET /api/v1/venues?fields=id,name&after=<id>&limit=<n>&genre=<name>
+#   GET /api/v1/venues/<id>?fields=...
+#   GET /api/v1/artists, /api/v1/artists/<id>, /api/v1/shows
+#   GET /api/v1/venues/available?start=<iso>&end=<iso>&city=..&state=..
+#       &genre=<name>&artist_id=<id>&seeking=0
+#   GET /api/v1/artists/available?...&venue_id=<id>
+#   GET /api/v1/venues/typeahead?q=<prefix>&limit=<n>, /api/v1/artists/typeahead
+#
+# List endpoints page with a keyset cursor (next_id) and stream their items
+# as they are read from the database.
+#----------------------------------------------------------------------------#
+import datetime
+import json
+
+from flask import Blueprint, Response, abort, current_app, request, stream_with_context
+from sqlalchemy.orm import joinedload, load_only, noload
+
+import availability
+import typeahead
+from models import db, Venue, Artist, Show, Genre
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+VENUE_FIELDS = ('id', 'name', 'city', 'state', 'address', 'phone', 'genres',
+                'image_link', 'facebook_link', 'website', 'seeking_talent',
+                'seeking_description')
+ARTIST_FIELDS = ('id', 'name', 'city', 'state', 'phone', 'genres',
+                 'image_link', 'facebook_link', 'website', 'seeking_venue',
+                 'seeking_description')
+SHOW_FIELDS = ('id', 'start_time', 'duration', 'venue_id', 'artist_id',
+               'venue_name', 'venue_image_link', 'artist_name', 'artist_image_link')
+
+
+def _default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    raise TypeError('%r is not JSON serializable' % obj)
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode()
+
+
+def json_response(obj, status=200):
+    return Response(dumps(obj), status=status, mimetype='application/json')
+
+
+@api.errorhandler(404)
+def not_found(error):
+    return json_response({'error': 'not found'}, 404)
+
+
+@api.errorhandler(400)
+def bad_request(error):
+    return json_response({'error': error.description}, 400)
+
+
+@api.errorhandler(409)
+def conflict(error):
+    return json_response({'error': error.description}, 409)
+
+
+def requested_fields(allowed):
+    fields = request.args.get('fields')
+    if not fields:
+        return allowed
+    fields = tuple(dict.fromkeys(f.strip() for f in fields.split(',') if f.strip()))
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        abort(400, 'unknown fields: ' + ','.join(sorted(unknown)))
+    return fields
+
+
+def page_args():
+    after_id = request.args.get('after', 0, type=int)
+    limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+    return after_id, max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+
+def window_args():
+    try:
+        start = datetime.datetime.fromisoformat(request.args['start'])
+        end = datetime.datetime.fromisoformat(request.args['end'])
+    except KeyError as e:
+        abort(400, 'missing %s' % e.args[0])
+    except ValueError as e:
+        abort(400, str(e))
+    if end <= start:
+        abort(400, 'end must be after start')
+    return start, end
+
+
+def entity_query(model, fields, query=None):
+    # Load only the requested columns; genres cost a selectin query, so
+    # skip them unless asked for. A query passed in has its filters applied
+    # already.
+    columns = [getattr(model, f) for f in fields if f not in ('id', 'genres')]
+    if query is None:
+        query = model.query
+        genre = request.args.get('genre')
+        if genre:
+            query = query.join(model.genres).filter(Genre.name == genre)
+    query = query.options(load_only(*columns) if columns else load_only(model.id))
+    if 'genres' not in fields:
+        query = query.options(noload(model.genres))
+    return query
+
+
+def entity_item(obj, fields):
+    return {f: obj.genre_names if f == 'genres' else getattr(obj, f)
+            for f in fields}
+
+
+def show_query(fields):
+    query = Show.query
+    if any(f.startswith('venue_') and f != 'venue_id' for f in fields):
+        query = query.options(joinedload(Show.venue).noload(Venue.genres))
+    if any(f.startswith('artist_') and f != 'artist_id' for f in fields):
+        query = query.options(joinedload(Show.artist).noload(Artist.genres))
+    return query
+
+
+def show_item(show, fields):
+    item = {}
+    for f in fields:
+        if f in ('venue_name', 'venue_image_link'):
+            item[f] = getattr(show.venue, f[len('venue_'):])
+        elif f in ('artist_name', 'artist_image_link'):
+            item[f] = getattr(show.artist, f[len('artist_'):])
+        else:
+            item[f] = getattr(show, f)
+    return item
+
+
+def stream_page(query, model, make_item):
+    """Stream one keyset page as {"data": [...], "next_id": ...}."""
+    after_id, limit = page_args()
+
+    def generate():
+        # The body is produced after the request's teardown has removed the
+        # session the query was built on: run it on the current one, and
+        # close that when done so its connection goes back to the pool.
+        try:
+            rows = query.with_session(db.session()).filter(
+                model.id > after_id).order_by(model.id).limit(limit + 1)
+            yield b'{"data":['
+            last_id = None
+            for n, obj in enumerate(rows.yield_per(100)):
+                if n == limit:
+                    break
+                yield (b',' if n else b'') + dumps(make_item(obj))
+                last_id = obj.id
+            else:
+                last_id = None
+            yield b'],"next_id":' + dumps(last_id) + b'}'
+        finally:
+            db.session.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def detail(model, entity_id, allowed):
+    fields = requested_fields(allowed + ('upcoming_shows', 'past_shows',
+                                         'upcoming_shows_count', 'past_shows_count'))
+    obj = db.session.get(model, entity_id)
+    if obj is None:
+        abort(404)
+    data = obj.srlz_shows_details
+    return json_response({f: data[f] for f in fields})
+
+
+@api.route('/venues')
+def venues():
+    fields = requested_fields(VENUE_FIELDS)
+    return stream_page(entity_query(Venue, fields), Venue,
+                       lambda v: entity_item(v, fields))
+
+
+def available(model, other, other_arg, allowed):
+    # Free rows of model for the window. Given the other side's id (the
+    # artist looking for a venue, or the venue looking for an artist), that
+    # one has to be free too and its genres are the default genre filter.
+    fields = requested_fields(allowed)
+    start, end = window_args()
+    genres = request.args.getlist('genre')
+    other_id = request.args.get(other_arg, type=int)
+    if other_id is not None:
+        obj = db.session.get(other, other_id)
+        if obj is None:
+            abort(404)
+        if not availability.is_free(other, other_id, start, end):
+            abort(409, '%s %d is booked in this window' % (other.__name__.lower(), other_id))
+        genres = genres or obj.genre_names
+    query = availability.available(
+        model, start, end,
+        city=request.args.get('city'), state=request.args.get('state'),
+        genres=genres, seeking=request.args.get('seeking', '1') != '0')
+    return stream_page(entity_query(model, fields, query), model,
+                       lambda obj: entity_item(obj, fields))
+
+
+@api.route('/venues/available')
+def available_venues():
+    return available(Venue, Artist, 'artist_id', VENUE_FIELDS)
+
+
+@api.route('/artists/available')
+def available_artists():
+    return available(Artist, Venue, 'venue_id', ARTIST_FIELDS)
+
+
+def typeahead_matches(model):
+    limit = request.args.get('limit', current_app.config['TYPEAHEAD_LIMIT'], type=int)
+    limit = max(1, min(limit, current_app.config['TYPEAHEAD_MAX_LIMIT']))
+    return json_response({'data': typeahead.lookup(model, request.args.get('q', ''), limit)})
+
+
+@api.route('/venues/typeahead')
+def venues_typeahead():
+    return typeahead_matches(Venue)
+
+
+@api.route('/artists/typeahead')
+def artists_typeahead():
+    return typeahead_matches(Artist)
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    return detail(Venue, venue_id, VENUE_FIELDS)
+
+
+@api.route('/artists')
+def artists():
+    fields = requested_fields(ARTIST_FIELDS)
+    return stream_page(entity_query(Artist, fields), Artist,
+                       lambda a: entity_item(a, fields))
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    return detail(Artist, artist_id, ARTIST_FIELDS)
+
+
+@api.route('/shows')
+def shows():
+    fields = requested_fields(SHOW_FIELDS)
+    return stream_page(show_query(fields), Show, lambda s: show_item(s, fields))
@@ -1,55 +1,75 @@
 #----------------------------------------------------------------------------#
 # Import the libraries
 #----------------------------------------------------------------------------#
-from distutils import errors
-from sys import exc_info
-import dateutil.parser
-import json
-import babel
-from flask_moment import Moment
-from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort
-from flask_sqlalchemy import SQLAlchemy
-from flask_wtf import Form
-from forms import *
-from sqlalchemy_utils import create_database, database_exists
-import logging
-from logging import Formatter, FileHandler
-import config
-from models import db, Artist, Venue, Show
+import datetime
+import functools
+import os
 import traceback
-from flask_migrate import Migrate
-from sqlalchemy.orm.exc import NoResultFound
+from flask import Blueprint, Flask, current_app, render_template, request, Response, flash, redirect, url_for, abort, jsonify, stream_with_context
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Artist, Venue, Show, Genre
+import search
+import counters
+from cache import cache, conditional
+
+main = Blueprint('main', __name__)
 
 #----------------------------------------------------------------------------#
-# Application config Config.
+# Filters.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-app.config.from_object('config')
-moment = Moment(app)
-db.init_app(app)
-migrate = Migrate(app, db)
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+@functools.lru_cache(maxsize=None)
+def compiled_datetime_format(format, locale):
+  # Babel pattern and locale, parsed once per (format, locale). Babel is
+  # imported on first use rather than at startup.
+  import babel.dates
+  return (babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)),
+          babel.Locale.parse(locale))
+
+@main.app_template_filter('datetime')
+def format_datetime(value, format='medium', locale='en'):
+  if isinstance(value, str):
+      import dateutil.parser
+      value = dateutil.parser.parse(value, ignoretz=True)
+  pattern, loc = compiled_datetime_format(format, locale)
+  return pattern.apply(value, loc)
 
 #----------------------------------------------------------------------------#
-# Filters.
+# Helpers.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  print(value)
-  date = dateutil.parser.parse(value,ignoretz=True)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
-
-app.jinja_env.filters['datetime'] = format_datetime
+def parse_date(value):
+    return datetime.datetime.fromisoformat(value)
+
+def buffered(chunks, size=16384):
+    # Jinja yields very small pieces; send them in reasonably sized writes.
+    buf = []
+    buf_len = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        buf_len += len(chunk)
+        if buf_len >= size:
+            yield ''.join(buf)
+            buf = []
+            buf_len = 0
+    if buf:
+        yield ''.join(buf)
+
+def stream_template(template_name, **context):
+    current_app.update_template_context(context)
+    template = current_app.jinja_env.get_template(template_name)
+    return Response(stream_with_context(buffered(template.generate(context))))
 
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
-@app.route('/')
+@main.route('/')
 def index():
     return render_template('pages/home.html')
 
@@ -57,18 +77,17 @@ def index():
 # Venues : Get/Search
 #----------------------------------------------------------------------------#
 
-@app.route('/venues')
+@main.route('/venues')
+@cache.cached('venues')
 def venues():
-    unique_city_states = Venue.query.distinct(Venue.city, Venue.state).all()
-    data = [uniq_st.filter_city_state for uniq_st in unique_city_states]
+    data = Venue.srlz_areas(request.args.get('genre'))
     return render_template('pages/venues.html', areas=data)
 
 
-@app.route('/venues/search', methods=['POST'])
+@main.route('/venues/search', methods=['POST'])
 def search_venues():
-    search_term = request.form.get('search_term', None)
-    venues = Venue.query.filter(
-        Venue.name.ilike("%{}%".format(search_term))).all()
+    search_term = request.form.get('search_term', '')
+    venues = search.search(Venue, search_term, current_app.config['SEARCH_RESULT_LIMIT'])
     venue_count = len(venues)
     response = {
         "count": venue_count,
@@ -77,24 +96,28 @@ def search_venues():
     return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
 
-@app.route('/venues/<int:venue_id>')
+@main.route('/venues/<int:venue_id>')
+@conditional(lambda venue_id: Venue.version(venue_id))
+@cache.cached('venue:{venue_id}')
 def show_venue(venue_id):
     venues = Venue.query.filter(Venue.id == venue_id).one_or_none()
     if venues is None:
         abort(404)
     data = venues.srlz_shows_details
+    cache.tag(*{'artist:%s' % s['artist_id']
+                for s in data['upcoming_shows'] + data['past_shows']})
     return render_template('pages/show_venue.html', venue=data)
 
 #  ----------------------------------------------------------------
 #  Venues: Create a Venue
 #  ----------------------------------------------------------------
 
-@app.route('/venues/create', methods=['GET'])
+@main.route('/venues/create', methods=['GET'])
 def create_venue_form():
     ven_form = VenueForm()
     return render_template('forms/new_venue.html', form=ven_form)
 
-@app.route('/venues/create', methods=['POST'])
+@main.route('/venues/create', methods=['POST'])
 def create_venue_submission():
     ven_form = VenueForm(request.form)
     if ven_form.validate():
@@ -105,7 +128,7 @@ def create_venue_submission():
                 phone=ven_form.phone.data,
                 facebook_link=ven_form.facebook_link.data,
                 website=ven_form.website.data,
-                genres=','.join(ven_form.genres.data),
+                genres=Genre.from_names(ven_form.genres.data),
                 address=ven_form.address.data,
                 city=ven_form.city.data,
                 image_link=ven_form.image_link.data,
@@ -127,7 +150,7 @@ def create_venue_submission():
 #  ----------------------------------------------------------------
 #  Venue : Edit an Venue
 #  ----------------------------------------------------------------
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@main.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
 
     ven_update = Venue.query.filter(Venue.id == venue_id).one_or_none()
@@ -140,7 +163,7 @@ def edit_venue(venue_id):
     return render_template('forms/edit_venue.html', form=ven_form, venue=ven)
 
 
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@main.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):  
     ven_form = VenueForm(request.form)
     if ven_form.validate():
@@ -154,7 +177,7 @@ def edit_venue_submission(venue_id):
             ven.image_link = ven_form.image_link.data
             ven.website = ven_form.website.data
             ven.address = ven_form.address.data
-            ven.genres = ','.join(ven_form.genres.data)
+            ven.genres = Genre.from_names(ven_form.genres.data)
             ven.seeking_talent=ven_form.seeking_talent.data
             ven.seeking_description = ven_form.seeking_description.data
             db.session.commit()
@@ -165,41 +188,60 @@ def edit_venue_submission(venue_id):
     else:
         for field,err_msgs in ven_form.errors.items():
             flash('The field ' + field +' has following error messages: ' + ','.join(err_msgs))
-    return redirect(url_for('show_venue', venue_id=venue_id))
+    return redirect(url_for('.show_venue', venue_id=venue_id))
 
 #  ----------------------------------------------------------------
 #  Venues: Delete a Venue
 #  ----------------------------------------------------------------
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@main.route('/venues/<venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
-    try:
-        ven = Venue.query.filter(Venue.id == venue_id).delete()
-        try:
-            db.session.commit()
-        except:
-            db.session.rollback()
-        finally:
-            db.session.close()
-        flash('Venue '+ ven[0]['name'] +'has been deleted.')
-    except NoResultFound:
+    ven = Venue.query.filter(Venue.id == venue_id).one_or_none()
+    if ven is None:
         abort(404)
+    ven_name = ven.name
+    try:
+        # The session itself is cleaned up by Flask-SQLAlchemy at the end
+        # of the request.
+        ven.delete()
+        flash('Venue ' + ven_name + ' has been deleted.')
+    except Exception as e:
+        db.session.rollback()
+        flash('Venue ' + ven_name + ' could not be deleted. ' + str(e))
     return render_template('pages/home.html')
 
 #  ----------------------------------------------------------------
 #  Artists : Get/Search
 #  ----------------------------------------------------------------
 
-@app.route('/artists')
-def artists():
-    art = Artist.query.all()
-    data = [a.srlz_shows_details for a in art]
-    return render_template('pages/artists.html', artists=data)
+def artists_page_args():
+    after_id = request.args.get('after', 0, type=int)
+    limit = request.args.get('limit', current_app.config['ARTISTS_PER_PAGE'], type=int)
+    limit = max(1, min(limit, current_app.config['ARTISTS_MAX_PER_PAGE']))
+    return after_id, limit, request.args.get('genre')
 
-@app.route('/artists/search', methods=['POST'])
+def artists_page():
+    after_id, limit, genre = artists_page_args()
+    return Artist.srlz_page(after_id, limit, genre), limit
+
+@main.route('/artists')
+@cache.cached('artists')
+def artists():
+    data, limit = artists_page()
+    return render_template('pages/artists.html', artists=data['artists'],
+                           next_id=data['next_id'], limit=limit,
+                           genre=request.args.get('genre'))
+
+@main.route('/artists.json')
+@cache.cached('artists')
+def artists_json():
+    data, _ = artists_page()
+    return jsonify(data)
+
+@main.route('/artists/search', methods=['POST'])
 def search_artists():
-    srch_trm = request.form.get('search_term', None)
-    art = Artist.query.filter(Artist.name.ilike("%{}%".format(srch_trm))).all()
+    srch_trm = request.form.get('search_term', '')
+    art = search.search(Artist, srch_trm, current_app.config['SEARCH_RESULT_LIMIT'])
     art_cnt = len(art)
     response = {
         "count": art_cnt,
@@ -207,7 +249,9 @@ def search_artists():
     }
     return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
-@app.route('/artists/<int:artist_id>')
+@main.route('/artists/<int:artist_id>')
+@conditional(lambda artist_id: Artist.version(artist_id))
+@cache.cached('artist:{artist_id}')
 def show_artist(artist_id):
     art = Artist.query.filter(Artist.id == artist_id).one_or_none()
 
@@ -215,6 +259,8 @@ def show_artist(artist_id):
         abort(404)
 
     art_data = art.srlz_shows_details
+    cache.tag(*{'venue:%s' % s['venue_id']
+                for s in art_data['upcoming_shows'] + art_data['past_shows']})
 
     return render_template('pages/show_artist.html', artist=art_data)
 
@@ -222,13 +268,13 @@ def show_artist(artist_id):
 #  Artists : Create an Artist
 #  ----------------------------------------------------------------
 
-@app.route('/artists/create', methods=['GET'])
+@main.route('/artists/create', methods=['GET'])
 def create_artist_form():
     art_form = ArtistForm()
     return render_template('forms/new_artist.html', form=art_form)
 
 
-@app.route('/artists/create', methods=['POST'])
+@main.route('/artists/create', methods=['POST'])
 def create_artist_submission():
     art_form = ArtistForm(request.form)
     if art_form.validate():
@@ -239,7 +285,7 @@ def create_artist_submission():
                 facebook_link=art_form.facebook_link.data,
                 image_link=art_form.image_link.data,
                 website=art_form.website.data,
-                genres=','.join(art_form.genres.data),
+                genres=Genre.from_names(art_form.genres.data),
                 address=art_form.address.data,
                 city=art_form.city.data,
                 state=art_form.state.data,
@@ -258,7 +304,7 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 #  Artist : Edit an Artist
 #  ----------------------------------------------------------------
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@main.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
 
     art_update = Artist.query.filter(Artist.id == artist_id).one_or_none()
@@ -270,19 +316,19 @@ def edit_artist(artist_id):
     return render_template('forms/edit_artist.html', form=art_form, artist=art)
 
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@main.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
     art_form = ArtistForm(request.form)
     if art_form.validate():
         try:
             art_update = Artist.query.filter_by(id=artist_id).one()
-            art_update.artist.name = art_form.name.data
+            art_update.name = art_form.name.data
             art_update.state = art_form.state.data
             art_update.phone = art_form.phone.data
             art_update.facebook_link = art_form.facebook_link.data
             art_update.image_link = art_form.image_link.data
             art_update.website = art_form.website.data
-            art_update.genres = ','.join(art_form.genres.data)
+            art_update.genres = Genre.from_names(art_form.genres.data)
             art_update.city = art_form.city.data
             art_update.seeking_venue=art_form.seeking_venue.data
             art_update.seeking_description=art_form.seeking_description.data
@@ -294,65 +340,175 @@ def edit_artist_submission(artist_id):
     else:
         for field,err_msgs in art_form.errors.items():
             flash('The field ' + field +' has following error messages: ' + ','.join(err_msgs))
-    return redirect(url_for('show_artist', artist_id=artist_id))
+    return redirect(url_for('.show_artist', artist_id=artist_id))
 
 #  ----------------------------------------------------------------
 #  Shows : Get
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
+@main.route('/shows')
+@cache.cached('shows', 'venues', 'artists')
 def shows():
-    shs = Show.query.all()
-    shows_data = [s.srlz_artist_venue for s in shs]
-    return render_template('pages/shows.html', shows=shows_data)
+    when = request.args.get('when', 'upcoming')
+    if when not in ('upcoming', 'past', 'all'):
+        abort(400)
+    start = request.args.get('from', None, type=parse_date)
+    end = request.args.get('to', None, type=parse_date)
+    if not current_app.config['SHOWS_STREAMING']:
+        shs = Show.query_artist_venue().filter(
+            *Show.window(when, start, end)).order_by(Show.start_time)
+        shows_data = [s.srlz_artist_venue for s in shs.all()]
+        return render_template('pages/shows.html', shows=shows_data, when=when)
+    batch_size = current_app.config['SHOWS_BATCH_SIZE']
+
+    def shows_data():
+        # Tiles are rendered and flushed batch by batch from a server-side
+        # cursor, so memory stays flat however many shows match. The query
+        # runs after the request's teardown has removed its session, so it
+        # is built here, on the session in use while streaming, and that
+        # session is closed when the body is done.
+        try:
+            shs = Show.query_artist_venue().filter(
+                *Show.window(when, start, end)).order_by(Show.start_time)
+            for s in shs.yield_per(batch_size):
+                yield s.srlz_artist_venue
+        finally:
+            db.session.close()
+    return stream_template('pages/shows.html', shows=shows_data(), when=when)
 
 #  ----------------------------------------------------------------
 #  Shows : Create a show
 #  ----------------------------------------------------------------
 
-@app.route('/shows/create')
+@main.route('/shows/create')
 def create_shows():
     form = ShowForm()
     return render_template('forms/new_show.html', form=form)
 
-@app.route('/shows/create', methods=['POST'])
+@main.route('/shows/create', methods=['POST'])
 def create_show_submission():
     show_form = ShowForm(request.form)
+    if not show_form.validate():
+        for field,err_msgs in show_form.errors.items():
+            flash('The field ' + field +' has following error messages: ' + ','.join(err_msgs))
+        return render_template('pages/home.html')
+
+    venue = db.session.get(Venue, show_form.venue_id.data)
+    artist = db.session.get(Artist, show_form.artist_id.data)
+    if venue is None:
+        flash('There is no venue with ID %d.' % show_form.venue_id.data)
+    if artist is None:
+        flash('There is no artist with ID %d.' % show_form.artist_id.data)
+    if venue is None or artist is None:
+        return render_template('pages/home.html')
+
+    conflicts = Show.conflicts(venue.id, artist.id, show_form.start_time.data,
+                               show_form.duration.data)
+    for other in conflicts:
+        who = venue.name if other.venue_id == venue.id else artist.name
+        flash('%s is already booked from %s to %s.' % (
+            who, format_datetime(other.start_time), format_datetime(other.end_time)))
+    if conflicts:
+        return render_template('pages/home.html')
+
     try:
         show = Show(
-            artist_id=show_form.artist_id.data,
-            venue_id=show_form.venue_id.data,
-            start_time=show_form.start_time.data
+            artist_id=artist.id,
+            venue_id=venue.id,
+            start_time=show_form.start_time.data,
+            duration=show_form.duration.data
         )
         show.add()
         # Successful insert into Database - notify on UI
         flash('Show was successfully onboarded.')
     except Exception as e:
+        # On PostgreSQL a booking racing this one trips the exclusion
+        # constraints and lands here.
+        db.session.rollback()
         flash('Show could not be onboarded. An error occured, please try again.'+str(e))
 
     return render_template('pages/home.html')
 
 
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+#----------------------------------------------------------------------------#
+# Application factory.
+#----------------------------------------------------------------------------#
+
+def create_app(config=None):
+    """Build the app from config.py, overridden by config (a mapping).
+
+    Optional subsystems are imported here, only when an app is built and
+    only if enabled, so importing this module stays cheap.
+    """
+    app = Flask(__name__)
+    app.config.from_object('config')
+    if config:
+        app.config.update(config)
+    if not app.config.get('SECRET_KEY'):
+        app.config['SECRET_KEY'] = os.urandom(32)
+        app.config['SECRET_KEY_GENERATED'] = True
+
+    import dbpool
+    import routing
+    dbpool.init_app(app)
+    routing.init_app(app)
+    db.init_app(app)
+    cache.init_app(app)
+    app.register_blueprint(main)
+    from api import api
+    app.register_blueprint(api)
+    if app.config.get('PROFILING') or not app.debug:
+        import profiling
+        profiling.init_app(app)
+    from jobs import jobs
+    jobs.init_app(app)
+    counters.init_app(app)
+    import assets
+    assets.init_app(app)
+    if app.config.get('ASYNC_READS'):
+        import aio
+        aio.init_app(app)
+
+    if os.environ.get('FLASK_RUN_FROM_CLI'):
+        init_cli(app)
+
+    if app.config.get('WARMUP'):
+        import warmup
+        warmup.warm(app)
+    return app
+
+
+def init_cli(app):
+    """Migrations and the maintenance commands; only the flask command
+    needs them, so web workers skip importing Alembic."""
+    from flask_migrate import Migrate
+    Migrate(app, db)
+    import assets
+    from bulk import import_data, export_data
+    for command in (import_data, export_data, counters.roll_show_counters,
+                    counters.check_show_counters, assets.build_assets):
+        app.cli.add_command(command)
+
+
+def __getattr__(name):
+    # `from app import app` (gunicorn app:app, flask run, scripts) builds
+    # the default app on first access; `import app` alone does not.
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(name)
+
 
 #----------------------------------------------------------------------------#
 # Launch.
@@ -360,11 +516,11 @@ if not app.debug:
 
 # Default port:
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
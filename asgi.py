@@ -0,0 +1,37 @@
+#----------------------------------------------------------------------------#
+# ASGI entry point, with the async read views on:
+#
+#   uvicorn asgi:app --workers 4 --limit-concurrency 200
+#
+# Flask is a WSGI app, so asgiref adapts it. Each request's WSGI part gets
+# a thread of its own (asgiref would otherwise run them all on one shared
+# thread), and the async views run on the server's event loop.
+#
+# That thread waits for its view, so a slow page still holds a thread for
+# as long as it takes, just as under gthread workers: `python benchmark.py
+# async` shows about the same requests per second either way. What the
+# async path changes is where the queries run (a bounded asyncio pool, see
+# aio.py), not how many requests are in flight; serving the read routes
+# without a thread each would take a native ASGI framework in front.
+#----------------------------------------------------------------------------#
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+
+
+def as_asgi(flask_app):
+    wsgi_app = WsgiToAsgi(flask_app)
+
+    async def asgi_app(scope, receive, send):
+        async with ThreadSensitiveContext():
+            await wsgi_app(scope, receive, send)
+    return asgi_app
+
+
+def __getattr__(name):
+    # Built on first access, like app.app.
+    if name == 'app':
+        from app import create_app
+        global app
+        app = as_asgi(create_app({'ASYNC_READS': True}))
+        return app
+    raise AttributeError(name)
@@ -0,0 +1,171 @@
+#----------------------------------------------------------------------------#
+# Fingerprinted, precompressed static assets.
+#
+#   flask build-assets
+#
+# copies every file under static/ to static/dist/ with a content hash in its
+# name (css/main.css -> css/main.1f3c9a0b2e.css) and writes gzip and, when
+# the brotli package is installed, brotli variants next to the compressible
+# ones. url() references inside CSS are rewritten to the hashed names. The
+# mapping is kept in static/dist/manifest.json.
+#
+# With a manifest present, url_for('static', filename='css/main.css') points
+# at the hashed file, and the static view serves hashed files in the best
+# encoding the client accepts with an immutable Cache-Control, so repeat
+# page loads need no requests for them at all. Without one (development),
+# static files are served as before.
+#----------------------------------------------------------------------------#
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+import click
+from flask import current_app, request, send_file
+from flask.cli import with_appcontext
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.eot', '.otf', '.ttf', '.json', '.txt')
+# (encoding, file suffix) in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_css_url_re = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def fingerprint(path, data):
+    root, ext = posixpath.splitext(path)
+    return '%s.%s%s' % (root, hashlib.md5(data).hexdigest()[:10], ext)
+
+
+def rewrite_css(path, text, manifest):
+    # Point relative url()s at the hashed files; both trees have the same
+    # layout, so the relative path stays valid.
+    base = posixpath.dirname(path)
+
+    def replace(match):
+        quote, url = match.groups()
+        if ':' in url or url.startswith(('/', '#')):
+            return match.group(0)
+        target, rest = re.match(r'([^?#]*)(.*)', url).groups()
+        entry = manifest.get(posixpath.normpath(posixpath.join(base, target)))
+        if entry is None:
+            return match.group(0)
+        hashed = posixpath.relpath(entry['file'][len(DIST) + 1:], base or '.')
+        return 'url(%s%s%s%s)' % (quote, hashed, rest, quote)
+    return _css_url_re.sub(replace, text)
+
+
+def compress(path, data):
+    """Write the encoded variants that are smaller; return their names."""
+    encodings = []
+    variants = {'gzip': lambda d: gzip.compress(d, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = lambda d: brotli.compress(d, quality=11)
+    for encoding, suffix in ENCODINGS:
+        if encoding not in variants:
+            continue
+        encoded = variants[encoding](data)
+        if len(encoded) < len(data) * 0.9:
+            with open(path + suffix, 'wb') as fp:
+                fp.write(encoded)
+            encodings.append(encoding)
+    return encodings
+
+
+def build(static_folder):
+    """Build static/dist from static/; returns the manifest."""
+    out = os.path.join(static_folder, DIST)
+    if os.path.exists(out):
+        shutil.rmtree(out)
+    sources = []
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        if os.path.abspath(dirpath) == os.path.abspath(out):
+            dirnames[:] = []
+            continue
+        dirnames.sort()
+        for name in sorted(filenames):
+            full = os.path.join(dirpath, name)
+            sources.append(os.path.relpath(full, static_folder).replace(os.sep, '/'))
+
+    manifest = {}
+    # CSS last, so what it references is hashed by then.
+    for logical in sorted(sources, key=lambda p: (p.endswith('.css'), p)):
+        with open(os.path.join(static_folder, logical), 'rb') as fp:
+            data = fp.read()
+        if logical.endswith('.css'):
+            data = rewrite_css(logical, data.decode('utf-8'), manifest).encode('utf-8')
+        hashed = posixpath.join(DIST, fingerprint(logical, data))
+        target = os.path.join(static_folder, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as fp:
+            fp.write(data)
+        encodings = []
+        if logical.endswith(COMPRESSIBLE):
+            encodings = compress(target, data)
+        manifest[logical] = {'file': hashed, 'size': len(data), 'encodings': encodings}
+
+    with open(os.path.join(out, MANIFEST), 'w') as fp:
+        json.dump(manifest, fp, indent=1, sort_keys=True)
+    return manifest
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets():
+    """Fingerprint and precompress static/ into static/dist."""
+    manifest = build(current_app.static_folder)
+    raw = sum(e['size'] for e in manifest.values())
+    click.echo('Built %d assets (%.1f KB)%s.' % (
+        len(manifest), raw / 1024, '' if brotli else ', no brotli installed'))
+
+
+def init_app(app):
+    path = os.path.join(app.static_folder, DIST, MANIFEST)
+    if not app.config.get('ASSETS_FINGERPRINT', True) or not os.path.exists(path):
+        return
+    with open(path) as fp:
+        manifest = json.load(fp)
+    # hashed path -> encodings available for it
+    hashed = {e['file']: e['encodings'] for e in manifest.values()}
+    cache_control = app.config.get('ASSETS_CACHE_CONTROL',
+                                   'public, max-age=31536000, immutable')
+    plain_static = app.view_functions['static']
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == 'static':
+            entry = manifest.get(values.get('filename'))
+            if entry is not None:
+                values['filename'] = entry['file']
+
+    def static(filename):
+        if filename not in hashed:
+            return plain_static(filename=filename)
+        path = os.path.join(app.static_folder, filename)
+        encoding = None
+        accepted = request.accept_encodings
+        for candidate, suffix in ENCODINGS:
+            if candidate in hashed[filename] and accepted[candidate]:
+                encoding = candidate
+                path += suffix
+                break
+        # Type from the logical name, not from the .br/.gz variant.
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = cache_control
+        return response
+
+    app.view_functions['static'] = static
@@ -0,0 +1,50 @@
+#----------------------------------------------------------------------------#
+# Availability search: venues (or artists) free for a whole time window.
+#
+# One query per page: the (state, city) index narrows the candidates, the
+# seeking flag and genre filters apply to them, and a correlated NOT EXISTS
+# drops every candidate with a booking overlapping [start, end). No booking
+# is longer than MAX_SHOW_MINUTES, so that probe is a bounded range seek on
+# the (venue_id|artist_id, start_time) index per candidate, however long
+# the venue's show history is.
+#----------------------------------------------------------------------------#
+import datetime
+
+from models import db, Venue, Artist, Show, Genre, MAX_SHOW_MINUTES
+
+# model -> (its Show foreign key, its seeking flag)
+SIDES = {
+    Venue: (Show.venue_id, Venue.seeking_talent),
+    Artist: (Show.artist_id, Artist.seeking_venue),
+}
+
+
+def overlapping(fk, entity_id, start, end):
+    """Criterion: a show on fk == entity_id overlaps [start, end)."""
+    return db.and_(fk == entity_id,
+                   Show.start_time < end,
+                   Show.start_time > start - datetime.timedelta(minutes=MAX_SHOW_MINUTES),
+                   Show.end_time > start)
+
+
+def is_free(model, entity_id, start, end):
+    fk = SIDES[model][0]
+    return not db.session.query(
+        db.exists().where(overlapping(fk, entity_id, start, end))).scalar()
+
+
+def available(model, start, end, city=None, state=None, genres=(), seeking=True):
+    """Query for the model's rows with no booking overlapping [start, end),
+    optionally narrowed to a city/state, to rows seeking bookings and to
+    rows sharing at least one of genres."""
+    fk, seeking_flag = SIDES[model]
+    query = model.query
+    if state:
+        query = query.filter(model.state == state)
+    if city:
+        query = query.filter(model.city == city)
+    if seeking:
+        query = query.filter(seeking_flag.is_(True))
+    if genres:
+        query = query.filter(model.genres.any(Genre.name.in_(list(genres))))
+    return query.filter(~db.exists().where(overlapping(fk, model.id, start, end)))
@@ -0,0 +1,590 @@
+#----------------------------------------------------------------------------#
+# Benchmarks.
+#
+#   python benchmark.py datetime [-n 20000]
+#   python benchmark.py conflicts [-n 20000] [--shows 50000]
+#   python benchmark.py typeahead [-n 20000] [--artists 5000]
+#   python benchmark.py startup [--runs 5]
+#   python benchmark.py async [--requests 200 --concurrency 16]
+#                             [--database-url postgresql://...]
+#   python benchmark.py routes [--venues 10000 --artists 50000 --shows 1000000]
+#                              [--database-url postgresql://...]
+#                              [--output bench_results.json]
+#                              [--compare bench_baseline.json]
+#
+# `routes` seeds a database with synthetic data (a SQLite file unless
+# --database-url is given), drives every route through the Flask test
+# client, the form posts and deletes last, and reports p50/p99 latency,
+# queries per request and peak Python memory per route. With --compare it exits non-zero when a route needs more
+# queries than the baseline or its p99 regressed by more than --tolerance.
+#
+# `async` seeds the same data and drives the read routes with --concurrency
+# requests in flight, first through the sync app on a thread per request
+# slot (like gunicorn's gthread workers), then through asgi.py's async
+# build on one event loop, and reports requests per second for each.
+#----------------------------------------------------------------------------#
+import argparse
+import datetime
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+import babel.dates
+import dateutil.parser
+
+
+def legacy_format_datetime(value, format='medium'):
+    # The `datetime` filter as it was: serializers handed it a strftime()
+    # string that it parsed back with dateutil before formatting with babel.
+    date = dateutil.parser.parse(value, ignoretz=True)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def bench_datetime(args):
+    from app import format_datetime
+
+    number = args.number
+    start_time = datetime.datetime(2026, 10, 18, 21, 30)
+    as_string = start_time.strftime("%m/%d/%Y, %H:%M:%S")
+    assert legacy_format_datetime(as_string, 'full') == format_datetime(start_time, 'full')
+
+    before = timeit.timeit(lambda: legacy_format_datetime(as_string, 'full'), number=number)
+    after = timeit.timeit(lambda: format_datetime(start_time, 'full'), number=number)
+    return {'calls': number,
+            'before_us_per_call': before / number * 1e6,
+            'after_us_per_call': after / number * 1e6,
+            'speedup': before / after}
+
+
+def bench_conflicts(args):
+    # One venue and one artist with --shows back-to-back bookings; times the
+    # conflict check for a clash and for a free slot in the middle of them.
+    os.environ['FYYUR_ENV'] = 'test'
+    os.environ['TEST_DATABASE_URL'] = 'sqlite://'
+    from app import app
+    from models import db, Venue, Artist, Show
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Venue(id=1, name='Venue'), Artist(id=1, name='Artist')])
+        db.session.flush()
+        base = datetime.datetime(2026, 1, 1)
+        db.session.execute(Show.__table__.insert(), [
+            {'venue_id': 1, 'artist_id': 1, 'duration': 120,
+             'start_time': base + datetime.timedelta(hours=3 * i)}
+            for i in range(args.shows)])
+        db.session.commit()
+
+        middle = base + datetime.timedelta(hours=3 * (args.shows // 2))
+        clash = middle + datetime.timedelta(minutes=30)
+        free = middle + datetime.timedelta(minutes=125)
+        assert Show.conflicts(1, 1, clash, 60) and not Show.conflicts(1, 1, free, 50)
+        number = args.number
+        clash_s = timeit.timeit(lambda: Show.conflicts(1, 1, clash, 60), number=number)
+        free_s = timeit.timeit(lambda: Show.conflicts(1, 1, free, 50), number=number)
+    return {'calls': number, 'shows': args.shows,
+            'clash_us_per_call': clash_s / number * 1e6,
+            'free_us_per_call': free_s / number * 1e6}
+
+
+def bench_typeahead(args):
+    # --artists artists with two-word names; times top-10 lookups for one-
+    # and three-letter prefixes and one added artist reaching the index.
+    os.environ['FYYUR_ENV'] = 'test'
+    os.environ['TEST_DATABASE_URL'] = 'sqlite://'
+    from app import app
+    from models import db, Artist
+    import typeahead
+
+    rng = random.Random(args.seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+
+    def word():
+        return ''.join(rng.choice(letters) for _ in range(rng.randint(3, 9))).title()
+
+    with app.test_request_context():
+        db.create_all()
+        db.session.execute(Artist.__table__.insert(), [
+            {'name': '%s %s' % (word(), word()), 'city': 'City', 'state': 'NY'}
+            for _ in range(args.artists)])
+        db.session.commit()
+        load_s = timeit.timeit(typeahead.INDEXES[Artist].load, number=1)
+        prefixes = [rng.choice(letters) for _ in range(100)]
+        longer = [''.join(rng.choice(letters) for _ in range(3)) for _ in range(100)]
+        number = args.number
+        short_s = timeit.timeit(lambda: typeahead.lookup(Artist, rng.choice(prefixes), 10),
+                                number=number)
+        long_s = timeit.timeit(lambda: typeahead.lookup(Artist, rng.choice(longer), 10),
+                               number=number)
+        db.session.add(Artist(name='Zzyzx Quartet', city='City', state='NY'))
+        db.session.commit()
+        assert typeahead.lookup(Artist, 'quart', 10)[0]['name'] == 'Zzyzx Quartet'
+    return {'calls': number, 'artists': args.artists,
+            'load_ms': load_s * 1000,
+            'one_letter_us_per_call': short_s / number * 1e6,
+            'three_letters_us_per_call': long_s / number * 1e6}
+
+
+#----------------------------------------------------------------------------#
+# Synthetic data.
+#----------------------------------------------------------------------------#
+
+def create_schema(db):
+    """Recreate the tables with create_all(). On PostgreSQL, first create
+    the extensions the migrations would (the trigram indexes need pg_trgm)."""
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.begin() as connection:
+            for extension in ('pg_trgm', 'btree_gist'):
+                connection.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS %s' % extension)
+    db.drop_all()
+    db.create_all()
+
+
+def seed(venues, artists, shows, rng, batch_size=10000):
+    import counters
+    from forms import VenueForm
+    from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+
+    genre_names = [c[0] for c in VenueForm.genres.kwargs['choices']]
+    states = [c[0] for c in VenueForm.state.kwargs['choices']]
+    cities = ['City %d' % i for i in range(max(1, venues // 25))]
+
+    db.session.execute(Genre.__table__.insert(),
+                       [{'id': i + 1, 'name': n} for i, n in enumerate(genre_names)])
+
+    def insert(table, rows):
+        for i in range(0, len(rows), batch_size):
+            db.session.execute(table.insert(), rows[i:i + batch_size])
+
+    def entities(model, link_table, fk, count, flag):
+        rows = []
+        links = []
+        for i in range(1, count + 1):
+            rows.append({'id': i,
+                         'name': '%s %d %s' % (model.__name__, i, rng.choice(genre_names)),
+                         'city': rng.choice(cities),
+                         'state': rng.choice(states),
+                         'address': '%d Main St' % i,
+                         'phone': '555-555-%04d' % (i % 10000),
+                         'image_link': 'https://example.com/%s/%d.jpg' % (model.__tablename__, i),
+                         'facebook_link': 'https://facebook.com/%d' % i,
+                         'website': 'https://example.com/%d' % i,
+                         flag: rng.random() < 0.3,
+                         'seeking_description': 'Looking for bookings'})
+            for genre_id in rng.sample(range(1, len(genre_names) + 1), rng.randint(1, 3)):
+                links.append({fk: i, 'genre_id': genre_id})
+        insert(model.__table__, rows)
+        insert(link_table, links)
+
+    entities(Venue, venue_genres, 'venue_id', venues, 'seeking_talent')
+    entities(Artist, artist_genres, 'artist_id', artists, 'seeking_venue')
+
+    now = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+    rows = []
+    for i in range(1, shows + 1):
+        rows.append({'id': i,
+                     'venue_id': rng.randint(1, venues),
+                     'artist_id': rng.randint(1, artists),
+                     'start_time': now + datetime.timedelta(hours=rng.randint(-2 * 8760, 8760))})
+        if len(rows) == batch_size:
+            insert(Show.__table__, rows)
+            rows = []
+    insert(Show.__table__, rows)
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        # The rows above were given explicit ids; move the sequences past
+        # them so the create routes can insert.
+        for model in (Genre, Venue, Artist, Show):
+            connection.exec_driver_sql(
+                "SELECT setval(pg_get_serial_sequence('\"%s\"', 'id'), "
+                "(SELECT max(id) FROM \"%s\"))" % (model.__tablename__, model.__tablename__))
+    counters.recount(connection, counters.watermark(connection))
+    db.session.commit()
+
+
+#----------------------------------------------------------------------------#
+# Routes.
+#----------------------------------------------------------------------------#
+
+def entity_form(rng, name):
+    from forms import VenueForm
+    genres = [c[0] for c in VenueForm.genres.kwargs['choices']]
+    states = [c[0] for c in VenueForm.state.kwargs['choices']]
+    return {'name': name, 'city': 'City 0', 'state': rng.choice(states),
+            'address': '1 Main St', 'phone': '555-555-0000',
+            'genres': rng.sample(genres, 2),
+            'image_link': 'https://example.com/image.jpg',
+            'facebook_link': 'https://facebook.com/bench',
+            'website': 'https://example.com', 'seeking_description': ''}
+
+
+def route_requests(venues, artists):
+    """(name, method, url factory, form data) for every route. Form data may
+    be a factory too. The write routes come last: edits and new shows use
+    seeded ids, and deletes work down from the last seeded venue, so the
+    read routes see the seeded data."""
+    show_day = itertools.count()
+    deleted = itertools.count(venues, -1)
+    later = datetime.datetime.now().replace(minute=0, second=0, microsecond=0) + \
+        datetime.timedelta(days=3650)
+
+    def show_form(rng):
+        start = later + datetime.timedelta(days=next(show_day))
+        return {'venue_id': rng.randint(1, venues), 'artist_id': rng.randint(1, artists),
+                'start_time': start.strftime('%Y-%m-%d %H:%M'), 'duration': 120}
+
+    return [
+        ('index', 'GET', lambda rng: '/', None),
+        ('venues', 'GET', lambda rng: '/venues', None),
+        ('venues_search', 'POST', lambda rng: '/venues/search', {'search_term': 'venue jazz'}),
+        ('show_venue', 'GET', lambda rng: '/venues/%d' % rng.randint(1, venues), None),
+        ('edit_venue', 'GET', lambda rng: '/venues/%d/edit' % rng.randint(1, venues), None),
+        ('create_venue_form', 'GET', lambda rng: '/venues/create', None),
+        ('artists', 'GET', lambda rng: '/artists', None),
+        ('artists_json', 'GET', lambda rng: '/artists.json', None),
+        ('artists_search', 'POST', lambda rng: '/artists/search', {'search_term': 'artist rock'}),
+        ('show_artist', 'GET', lambda rng: '/artists/%d' % rng.randint(1, artists), None),
+        ('edit_artist', 'GET', lambda rng: '/artists/%d/edit' % rng.randint(1, artists), None),
+        ('create_artist_form', 'GET', lambda rng: '/artists/create', None),
+        ('shows', 'GET', lambda rng: '/shows', None),
+        ('create_shows', 'GET', lambda rng: '/shows/create', None),
+        ('api_venues', 'GET', lambda rng: '/api/v1/venues', None),
+        ('api_artists', 'GET', lambda rng: '/api/v1/artists', None),
+        ('api_shows', 'GET', lambda rng: '/api/v1/shows', None),
+        ('api_venue', 'GET', lambda rng: '/api/v1/venues/%d' % rng.randint(1, venues), None),
+        ('api_artist', 'GET', lambda rng: '/api/v1/artists/%d' % rng.randint(1, artists), None),
+        ('api_venues_available', 'GET', available_url, None),
+        ('api_artists_typeahead', 'GET', lambda rng: '/api/v1/artists/typeahead?q=ar', None),
+        ('create_venue', 'POST', lambda rng: '/venues/create',
+         lambda rng: entity_form(rng, 'New Venue %d' % rng.randint(1, 10 ** 6))),
+        ('edit_venue_submission', 'POST', lambda rng: '/venues/%d/edit' % rng.randint(1, venues),
+         lambda rng: entity_form(rng, 'Edited Venue %d' % rng.randint(1, 10 ** 6))),
+        ('create_artist', 'POST', lambda rng: '/artists/create',
+         lambda rng: entity_form(rng, 'New Artist %d' % rng.randint(1, 10 ** 6))),
+        ('edit_artist_submission', 'POST', lambda rng: '/artists/%d/edit' % rng.randint(1, artists),
+         lambda rng: entity_form(rng, 'Edited Artist %d' % rng.randint(1, 10 ** 6))),
+        ('create_show', 'POST', lambda rng: '/shows/create', show_form),
+        ('delete_venue', 'DELETE', lambda rng: '/venues/%d' % next(deleted), None),
+    ]
+
+
+def available_url(rng):
+    start = datetime.datetime.now().replace(minute=0, second=0, microsecond=0) + \
+        datetime.timedelta(hours=rng.randint(1, 8760))
+    return '/api/v1/venues/available?start=%s&end=%s' % (
+        start.isoformat(), (start + datetime.timedelta(hours=3)).isoformat())
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+
+def bench_routes(args):
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+        os.environ.setdefault('FYYUR_ENV', 'benchmark')
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix='fyyur-bench-'), 'bench.db')
+        os.environ['FYYUR_ENV'] = 'test'
+        os.environ['TEST_DATABASE_URL'] = 'sqlite:///' + path
+    import config
+    if not args.cache:
+        config.CACHE_TYPE = 'null'
+
+    from sqlalchemy import event
+    from app import app
+    from models import db
+
+    rng = random.Random(args.seed)
+    results = {'volumes': {'venues': args.venues, 'artists': args.artists,
+                           'shows': args.shows},
+               'database': None, 'routes': {}}
+    with app.app_context():
+        results['database'] = db.engine.dialect.name
+        create_schema(db)
+        started = time.perf_counter()
+        seed(args.venues, args.artists, args.shows, rng)
+        results['seed_seconds'] = round(time.perf_counter() - started, 2)
+
+        queries = [0]
+
+        def count_query(*a):
+            queries[0] += 1
+        event.listen(db.engine, 'before_cursor_execute', count_query)
+
+        client = app.test_client()
+
+        def call(method, url, data):
+            if callable(data):
+                data = data(rng)
+            response = client.open(url, method=method, data=data)
+            response.get_data()
+            return response
+
+        for name, method, url, data in route_requests(args.venues, args.artists):
+            timings = []
+            counts = []
+            statuses = set()
+            for _ in range(args.requests):
+                queries[0] = 0
+                begin = time.perf_counter()
+                response = call(method, url(rng), data)
+                timings.append((time.perf_counter() - begin) * 1000)
+                counts.append(queries[0])
+                statuses.add(response.status_code)
+
+            # Memory is measured in a separate pass; tracemalloc would
+            # distort the timings above.
+            tracemalloc.start()
+            call(method, url(rng), data)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            results['routes'][name] = {'requests': args.requests,
+                                       'status': sorted(statuses),
+                                       'p50_ms': round(percentile(timings, 50), 2),
+                                       'p99_ms': round(percentile(timings, 99), 2),
+                                       'queries_per_request': max(counts),
+                                       'peak_memory_kb': round(peak / 1024, 1)}
+            print('%-20s p50 %8.2fms  p99 %8.2fms  %3d queries  %9.1fKB' % (
+                name, percentile(timings, 50), percentile(timings, 99),
+                max(counts), peak / 1024), file=sys.stderr)
+
+        event.remove(db.engine, 'before_cursor_execute', count_query)
+
+    with open(args.output, 'w') as fp:
+        json.dump(results, fp, indent=2, sort_keys=True)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        results['regressions'] = regressions
+        for line in regressions:
+            print('REGRESSION ' + line, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+    return results
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as fp:
+        baseline = json.load(fp)
+    regressions = []
+    for name, base in baseline.get('routes', {}).items():
+        current = results['routes'].get(name)
+        if current is None:
+            regressions.append('%s: missing from results' % name)
+            continue
+        if current['queries_per_request'] > base['queries_per_request']:
+            regressions.append('%s: %d queries per request, baseline %d' % (
+                name, current['queries_per_request'], base['queries_per_request']))
+        if current['p99_ms'] > base['p99_ms'] * (1 + tolerance):
+            regressions.append('%s: p99 %.2fms, baseline %.2fms' % (
+                name, current['p99_ms'], base['p99_ms']))
+    return regressions
+
+
+#----------------------------------------------------------------------------#
+# Startup.
+#----------------------------------------------------------------------------#
+
+# Runs in a fresh interpreter per sample. The page cache is off so the
+# first requests measure template compilation and statement caching.
+STARTUP_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app({'CACHE_TYPE': 'null'})
+created = time.perf_counter()
+client = application.test_client()
+first = {}
+for url in sys.argv[1:]:
+    begin = time.perf_counter()
+    client.get(url).get_data()
+    first[url] = (time.perf_counter() - begin) * 1000
+print(json.dumps({'import_ms': (imported - started) * 1000,
+                  'create_app_ms': (created - imported) * 1000,
+                  'first_request_ms': first}))
+'''
+
+STARTUP_URLS = ('/', '/venues', '/artists', '/shows', '/venues/1', '/artists/1')
+
+
+def bench_startup(args):
+    path = os.path.join(tempfile.mkdtemp(prefix='fyyur-bench-'), 'startup.db')
+    os.environ['FYYUR_ENV'] = 'test'
+    os.environ['TEST_DATABASE_URL'] = 'sqlite:///' + path
+    from app import create_app
+    from models import db
+
+    app = create_app({'WARMUP': False})
+    with app.app_context():
+        db.create_all()
+        seed(args.venues, args.artists, args.shows, random.Random(args.seed))
+        db.session.remove()
+        db.engine.dispose()
+
+    results = {}
+    for warmup in (False, True):
+        env = dict(os.environ, WARMUP='1' if warmup else '0')
+        samples = []
+        for _ in range(args.runs):
+            out = subprocess.run([sys.executable, '-c', STARTUP_PROBE] + list(STARTUP_URLS),
+                                 env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                 check=True, capture_output=True, text=True).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+        results['warmup' if warmup else 'cold'] = {
+            'import_ms': round(statistics.median(s['import_ms'] for s in samples), 1),
+            'create_app_ms': round(statistics.median(s['create_app_ms'] for s in samples), 1),
+            'first_request_ms': {url: round(statistics.median(
+                s['first_request_ms'][url] for s in samples), 2) for url in STARTUP_URLS}}
+    results['runs'] = args.runs
+    return results
+
+
+#----------------------------------------------------------------------------#
+# Sync vs. async serving.
+#----------------------------------------------------------------------------#
+
+ASYNC_URLS = ('/venues', '/artists', '/shows', '/venues/%d', '/artists/%d')
+
+
+def throughput(latencies, seconds):
+    return {'requests': len(latencies),
+            'requests_per_second': round(len(latencies) / seconds, 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2)}
+
+
+def asgi_get(asgi_app, url):
+    import asyncio
+    path, _, query = url.partition('?')
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+             'method': 'GET', 'scheme': 'http', 'path': path,
+             'raw_path': path.encode(), 'query_string': query.encode(),
+             'root_path': '', 'headers': [(b'host', b'localhost')],
+             'server': ('localhost', 80), 'client': ('127.0.0.1', 1)}
+    status = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    async def get():
+        await asgi_app(scope, receive, send)
+        assert status == [200], (url, status)
+    return get()
+
+
+def bench_async(args):
+    import asyncio
+    import concurrent.futures
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+        os.environ.setdefault('FYYUR_ENV', 'benchmark')
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix='fyyur-bench-'), 'async.db')
+        os.environ['FYYUR_ENV'] = 'test'
+        os.environ['TEST_DATABASE_URL'] = 'sqlite:///' + path
+    from app import create_app
+    from asgi import as_asgi
+    from models import db
+
+    overrides = {'CACHE_TYPE': 'null', 'WARMUP': False}
+    sync_app = create_app(overrides)
+    with sync_app.app_context():
+        create_schema(db)
+        seed(args.venues, args.artists, args.shows, random.Random(args.seed))
+        db.session.remove()
+    rng = random.Random(args.seed)
+    urls = [u % rng.randint(1, args.venues if 'venues' in u else args.artists)
+            if '%d' in u else u
+            for u in (rng.choice(ASYNC_URLS) for _ in range(args.requests))]
+
+    def sync_get(url):
+        begin = time.perf_counter()
+        response = sync_app.test_client().get(url)
+        response.get_data()
+        assert response.status_code == 200, (url, response.status_code)
+        return time.perf_counter() - begin
+
+    sync_get(urls[0])
+    with concurrent.futures.ThreadPoolExecutor(args.concurrency) as pool:
+        started = time.perf_counter()
+        latencies = list(pool.map(sync_get, urls))
+        sync_s = time.perf_counter() - started
+    results = {'sync': throughput(latencies, sync_s)}
+
+    asgi_app = as_asgi(create_app(dict(overrides, ASYNC_READS=True)))
+
+    async def drive():
+        slots = asyncio.Semaphore(args.concurrency)
+
+        async def timed(url):
+            async with slots:
+                begin = time.perf_counter()
+                await asgi_get(asgi_app, url)
+                return time.perf_counter() - begin
+        await timed(urls[0])
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(timed(url) for url in urls))
+        return latencies, time.perf_counter() - started
+
+    latencies, async_s = asyncio.run(drive())
+    results['async'] = throughput(latencies, async_s)
+    results['concurrency'] = args.concurrency
+    results['speedup'] = round(sync_s / async_s, 2)
+    return results
+
+
+BENCHMARKS = {'datetime': bench_datetime, 'conflicts': bench_conflicts,
+              'typeahead': bench_typeahead, 'routes': bench_routes,
+              'startup': bench_startup, 'async': bench_async}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run Fyyur benchmarks.')
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('-n', '--number', type=int, default=20000,
+                        help='datetime/conflicts: calls to time')
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--shows', type=int, default=50000)
+    parser.add_argument('--requests', type=int, default=20,
+                        help='routes: requests per route; async: requests per mode')
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='async: requests in flight')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--runs', type=int, default=5,
+                        help='startup: fresh interpreters per mode')
+    parser.add_argument('--database-url',
+                        help='routes/async: database to seed (it is dropped and recreated)')
+    parser.add_argument('--cache', action='store_true',
+                        help='routes: keep the page cache on')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='routes: baseline results to check against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='routes: allowed relative p99 regression')
+    args = parser.parse_args()
+    # Keep the benchmark's (and its subprocesses') log lines out of the
+    # repository's error.log.
+    os.environ.setdefault('LOG_FILE', os.path.join(
+        tempfile.mkdtemp(prefix='fyyur-bench-'), 'benchmark.log'))
+    result = BENCHMARKS[args.benchmark](args)
+    print(json.dumps(result, indent=2, sort_keys=True))
@@ -0,0 +1,277 @@
+#----------------------------------------------------------------------------#
+# Page cache for the read-only routes.
+#
+# Cached pages carry tags naming the rows they were built from ('venues',
+# 'venue:3', ...). Committed writes to Venue, Artist or Show invalidate the
+# matching tags through SQLAlchemy session events. Invalidation is
+# per-process, so CACHE_TTL bounds how stale other workers can be. Pages
+# read from a replica (routing.py) are not stored for a while after their
+# tags were invalidated, since the replica may not have the write yet.
+#----------------------------------------------------------------------------#
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, current_app, g, jsonify, make_response, request, session
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import Venue, Artist, Show
+
+
+class LRUCache:
+    """In-process LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize=1024, ttl=300, on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        evicted = []
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                evicted.append(self.entries.popitem(last=False)[0])
+        if self.on_evict:
+            for k in evicted:
+                self.on_evict(k)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class NullCache:
+    """Backend that stores nothing, for turning the cache off."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+BACKENDS = {'lru': LRUCache, 'null': NullCache}
+
+
+def model_tags(obj):
+    """Tags invalidated by a write to obj."""
+    if isinstance(obj, Venue):
+        return {'venues', 'venue:%s' % obj.id}
+    if isinstance(obj, Artist):
+        return {'artists', 'artist:%s' % obj.id}
+    if isinstance(obj, Show):
+        return {'shows', 'venues',
+                'venue:%s' % obj.venue_id, 'artist:%s' % obj.artist_id}
+    return set()
+
+
+class PageCache:
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        self.tag_keys = {}
+        self.key_tags = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # tag -> when it was last invalidated (time.monotonic())
+        self.invalidated_at = {}
+        self.replica_lag = 10
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = BACKENDS[app.config.get('CACHE_TYPE', 'lru')]
+        self.backend = backend(maxsize=app.config.get('CACHE_MAXSIZE', 1024),
+                               ttl=app.config.get('CACHE_TTL', 300),
+                               on_evict=self._forget)
+        self.replica_lag = app.config.get('DB_REPLICA_STICKY_SECONDS', 10)
+        app.extensions['page_cache'] = self
+
+        if app.config.get('EXPOSE_STATS'):
+            @app.route('/cache/stats')
+            def cache_stats():
+                return jsonify(self.stats())
+
+        event.listen(Session, 'after_flush', _collect_tags)
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_rollback', _discard_tags)
+        event.listen(Session, 'after_bulk_update', self._after_bulk)
+        event.listen(Session, 'after_bulk_delete', self._after_bulk)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'backend': type(self.backend).__name__,
+                'size': len(self.backend),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations}
+
+    def tag(self, *tags):
+        """Attach extra tags to the page being rendered."""
+        if 'cache_tags' in g:
+            g.cache_tags.update(tags)
+
+    def _forget(self, key):
+        with self.lock:
+            for tag in self.key_tags.pop(key, ()):
+                keys = self.tag_keys.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.tag_keys[tag]
+
+    def invalidate(self, *tags):
+        now = time.monotonic()
+        with self.lock:
+            keys = set()
+            for tag in tags:
+                keys |= self.tag_keys.get(tag, set())
+                self.invalidated_at[tag] = now
+            if len(self.invalidated_at) > 1024:
+                cutoff = now - self.replica_lag
+                self.invalidated_at = {t: at for t, at in self.invalidated_at.items()
+                                       if at > cutoff}
+        for key in keys:
+            self.backend.delete(key)
+            self._forget(key)
+        self.invalidations += len(keys)
+
+    def clear(self):
+        self.backend.clear()
+        with self.lock:
+            self.tag_keys.clear()
+            self.key_tags.clear()
+
+    def _maybe_stale(self, tags):
+        # Read from a replica soon after a write to one of its rows.
+        if not g.get('replica'):
+            return False
+        cutoff = time.monotonic() - self.replica_lag
+        return any(self.invalidated_at.get(tag, 0) > cutoff for tag in tags)
+
+    def _after_commit(self, session):
+        tags = session.info.pop('cache_tags', None)
+        if tags:
+            self.invalidate(*tags)
+
+    def _after_bulk(self, context):
+        # Query.update()/delete() don't tell us which rows changed.
+        self.clear()
+
+    def cached(self, *tags):
+        """Cache a GET view's response under its full path, tagged with
+        tags (formatted with the view arguments) plus any added through
+        tag() while the view ran."""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(**kwargs):
+                # The view may be a coroutine function (aio.py).
+                run = current_app.ensure_sync(view)
+                # Pages with pending flash messages are never served from
+                # or stored in the cache.
+                if session.get('_flashes'):
+                    return run(**kwargs)
+                key = request.full_path
+                page = self.backend.get(key)
+                if page is not None:
+                    self.hits += 1
+                    return Response(page[0], status=page[1], mimetype=page[2])
+                self.misses += 1
+                g.cache_tags = {t.format(**kwargs) for t in tags}
+                rv = run(**kwargs)
+                response = make_response(rv)
+                if (response.status_code == 200 and not response.is_streamed
+                        and not self._maybe_stale(g.cache_tags)):
+                    self.backend.set(key, (response.get_data(),
+                                           response.status_code,
+                                           response.mimetype))
+                    with self.lock:
+                        self.key_tags[key] = g.cache_tags
+                        for tag in g.cache_tags:
+                            self.tag_keys.setdefault(tag, set()).add(key)
+                return response
+            return wrapper
+        return decorator
+
+
+def conditional(version):
+    """Answer If-None-Match with 304 from version(**view_args), a cheap
+    tuple that changes whenever the page would. Missing entities (version
+    returns None) fall through to the view. Either may be a coroutine
+    function."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            # A page carrying flash messages is for this user, this once:
+            # always render it, and keep it out of every cache.
+            if session.get('_flashes'):
+                response = make_response(current_app.ensure_sync(view)(**kwargs))
+                response.headers['Cache-Control'] = 'private, no-store'
+                return response
+            current = current_app.ensure_sync(version)(**kwargs)
+            if current is None:
+                return current_app.ensure_sync(view)(**kwargs)
+            etag = hashlib.md5(repr(current).encode()).hexdigest()
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(current_app.ensure_sync(view)(**kwargs))
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = current_app.config['ENTITY_CACHE_CONTROL']
+            return response
+        return wrapper
+    return decorator
+
+
+def _collect_tags(session, flush_context):
+    tags = session.info.setdefault('cache_tags', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tags |= model_tags(obj)
+
+
+def _discard_tags(session):
+    session.info.pop('cache_tags', None)
+
+
+cache = PageCache()
@@ -1,14 +1,150 @@
 import os
-SECRET_KEY = os.urandom(32)
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Without one, create_app() makes up a key per process; session cookies
+# then don't survive restarts or carry over between workers.
+SECRET_KEY = os.environ.get('SECRET_KEY')
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+# 'development', 'production' or 'test' (SQLite, no CSRF)
+FYYUR_ENV = os.environ.get('FYYUR_ENV', 'development')
+
 # Enable debug mode.
-DEBUG = True
+DEBUG = env_bool('DEBUG', FYYUR_ENV == 'development')
 
 # Connect to the database
+if FYYUR_ENV == 'test':
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'TEST_DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'test.db'))
+    WTF_CSRF_ENABLED = False
+else:
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'DATABASE_URL', "postgresql://{}@{}/{}".format(
+            "postgres:postgres", 'localhost', "fyyur"))
+# Change tracking is done through SQLAlchemy session events (cache.py);
+# Flask-SQLAlchemy's own tracking only adds overhead to every flush.
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Engine and pool options. Pool sizing only applies to server databases;
+# SQLite uses SQLAlchemy's default pools. Size per gunicorn worker:
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay under the server's
+# max_connections.
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_pre_ping': env_bool('DB_POOL_PRE_PING', True),
+}
+if not SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+    SQLALCHEMY_ENGINE_OPTIONS.update({
+        'pool_size': env_int('DB_POOL_SIZE', 5),
+        'max_overflow': env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': env_int('DB_POOL_RECYCLE', 1800),
+    })
+    # Milliseconds, 0 for no limit.
+    DB_STATEMENT_TIMEOUT = env_int('DB_STATEMENT_TIMEOUT', 30000)
+    if SQLALCHEMY_DATABASE_URI.startswith('postgresql') and DB_STATEMENT_TIMEOUT:
+        SQLALCHEMY_ENGINE_OPTIONS['connect_args'] = {
+            'options': '-c statement_timeout={}'.format(DB_STATEMENT_TIMEOUT)}
+
+# Read replicas, as comma-separated URLs (routing.py). GET requests read
+# from one of them; writes go to the primary, and so does every request
+# from a client for DB_REPLICA_STICKY_SECONDS after it wrote, which should
+# cover the replicas' usual lag.
+DB_REPLICA_URLS = [url.strip() for url in
+                   os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+DB_REPLICA_STICKY_SECONDS = env_int('DB_REPLICA_STICKY_SECONDS', 10)
+
+# Artist listing page size (keyset pagination)
+ARTISTS_PER_PAGE = 50
+ARTISTS_MAX_PER_PAGE = 500
+
+# Maximum number of results returned by the venue/artist search
+SEARCH_RESULT_LIMIT = 50
+
+# Name typeahead for the show form: default/maximum matches per request, and
+# how old (seconds) a worker's index may get before it reloads in the
+# background to pick up other workers' writes
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+TYPEAHEAD_MAX_AGE = 60
+
+# Page cache for the read-only routes ('lru' or 'null' to disable)
+CACHE_TYPE = 'lru'
+CACHE_MAXSIZE = 1024
+CACHE_TTL = 300
+
+# Serve per-process stats as JSON (/cache/stats, /db/pool/stats,
+# /jobs/stats). They are not authenticated, so only turn this on where
+# the app isn't public.
+EXPOSE_STATS = env_bool('EXPOSE_STATS', False)
+
+# Cache-Control for venue/artist pages; clients and CDNs revalidate with ETags
+ENTITY_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+
+# /api/v1 list page size
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+
+# Stream /shows from a server-side cursor, SHOWS_BATCH_SIZE rows at a time.
+# A streamed page isn't kept in the page cache, so with this on every
+# /shows request queries the database; turn it off to cache /shows like the
+# other list pages.
+SHOWS_STREAMING = True
+SHOWS_BATCH_SIZE = 500
+
+# Structured (JSON lines) log file, used when DEBUG is off
+LOG_FILE = os.environ.get('LOG_FILE', 'error.log')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+# Per-request query/DB time/template profiling with Server-Timing headers.
+# Requests over either threshold are logged as warnings with their slowest
+# statements.
+PROFILING = env_bool('PROFILING', False)
+PROFILING_SLOWEST = 3
+QUERY_COUNT_THRESHOLD = env_int('QUERY_COUNT_THRESHOLD', 20)
+SLOW_REQUEST_MS = env_int('SLOW_REQUEST_MS', 500)
+
+# Background jobs: 'thread' (worker threads) or 'inline' (run in the
+# caller; the test default).
+# A full queue makes the enqueuing request run the job itself after waiting
+# JOBS_ENQUEUE_TIMEOUT seconds.
+JOBS_MODE = os.environ.get('JOBS_MODE', 'inline' if FYYUR_ENV == 'test' else 'thread')
+JOBS_WORKERS = env_int('JOBS_WORKERS', 4)
+JOBS_QUEUE_SIZE = env_int('JOBS_QUEUE_SIZE', 1000)
+JOBS_ENQUEUE_TIMEOUT = 0.5
+JOBS_MAX_RETRIES = 3
+JOBS_RETRY_DELAY = 0.5
+JOBS_SHUTDOWN_TIMEOUT = 10
+
+# Seconds between the show counter rolls each web process queues as a job
+# (counters.py); 0 to leave them to `flask roll-show-counters` on a schedule
+SHOW_COUNTERS_ROLL_INTERVAL = env_int('SHOW_COUNTERS_ROLL_INTERVAL', 300)
+
+# Serve the fingerprinted static/dist build (flask build-assets) when present
+ASSETS_FINGERPRINT = env_bool('ASSETS_FINGERPRINT', True)
+ASSETS_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Serve the read routes from async views on SQLAlchemy's asyncio engine
+# (aio.py; run under an ASGI server with asgi.py). Needs flask[async] and
+# the async driver: aiosqlite for SQLite, asyncpg for PostgreSQL. The URL
+# defaults to the sync one with the driver swapped.
+ASYNC_READS = env_bool('ASYNC_READS', False)
+ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URL')
+ASYNC_POOL_SIZE = env_int('ASYNC_POOL_SIZE', 10)
+ASYNC_MAX_OVERFLOW = env_int('ASYNC_MAX_OVERFLOW', 0)
+ASYNC_POOL_TIMEOUT = env_int('ASYNC_POOL_TIMEOUT', 30)
 
-# TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = "postgresql://{}@{}/{}".format(
-    "postgres:postgres", 'localhost', "fyyur")
-SQLALCHEMY_TRACK_MODIFICATIONS = True
\ No newline at end of file
+# Compile templates and run each read route once when the app is created,
+# before the worker takes traffic
+WARMUP = env_bool('WARMUP', False)
@@ -0,0 +1,201 @@
+#----------------------------------------------------------------------------#
+# Denormalized upcoming/past show counters on Venue and Artist.
+#
+# A show counts as upcoming while its start_time is after the watermark in
+# ShowCounterState.rolled_at. Show inserts, deletes and updates (Show.add(),
+# Show.delete(), cascades from venue/artist deletes) adjust the counters
+# in the same transaction. A roll moves shows whose start_time has passed
+# from upcoming to past and advances the watermark. Each web process
+# queues one as a job every SHOW_COUNTERS_ROLL_INTERVAL seconds while it
+# serves requests; with the interval at 0, run `flask roll-show-counters`
+# from a scheduler (cron, Heroku Scheduler) instead.
+# `flask check-show-counters` compares the counters with a full recount.
+#
+# Show writes read the watermark under a shared row lock and roll() takes
+# it exclusively, so on PostgreSQL a roll waits for in-flight show writes
+# (and they for it) without show writes waiting on each other. SQLite has
+# no row locks; it serializes writers as a whole. If counters drift anyway
+# (rows changed outside the ORM, a restored backup), `flask
+# check-show-counters --fix` recounts them. The single ShowCounterState
+# row comes from the migration (or create_all, see models.py).
+#----------------------------------------------------------------------------#
+import datetime
+import threading
+import time
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, select, func
+
+import jobs
+from models import db, Venue, Artist, Show, ShowCounterState
+
+SIDES = ((Venue, Show.venue_id, 'venue_id'), (Artist, Show.artist_id, 'artist_id'))
+
+
+def watermark(connection, lock=False):
+    query = select(ShowCounterState.rolled_at)
+    if lock:
+        query = query.with_for_update(read=True)
+    mark = connection.execute(query).scalar()
+    if mark is None:
+        raise RuntimeError('ShowCounterState is empty; run flask db upgrade')
+    return mark
+
+
+def adjust(connection, model, entity_id, upcoming, delta):
+    column = 'upcoming_shows_count' if upcoming else 'past_shows_count'
+    table = model.__table__
+    connection.execute(table.update().where(table.c.id == entity_id).values(
+        {column: table.c[column] + delta}))
+
+
+def _after_insert(mapper, connection, target):
+    upcoming = target.start_time > watermark(connection, lock=True)
+    adjust(connection, Venue, target.venue_id, upcoming, 1)
+    adjust(connection, Artist, target.artist_id, upcoming, 1)
+
+
+def _after_delete(mapper, connection, target):
+    upcoming = target.start_time > watermark(connection, lock=True)
+    adjust(connection, Venue, target.venue_id, upcoming, -1)
+    adjust(connection, Artist, target.artist_id, upcoming, -1)
+
+
+def _old_value(state, attr):
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, attr)
+
+
+def _after_update(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[a].history.has_changes()
+               for a in ('start_time', 'venue_id', 'artist_id')):
+        return
+    mark = watermark(connection, lock=True)
+    was_upcoming = _old_value(state, 'start_time') > mark
+    upcoming = target.start_time > mark
+    for model, _, attr in SIDES:
+        adjust(connection, model, _old_value(state, attr), was_upcoming, -1)
+        adjust(connection, model, getattr(target, attr), upcoming, 1)
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Load the old value when one of these is set on an expired Show (after a
+# commit, say); otherwise its history is empty and _after_update can't tell
+# where the show was counted.
+for _attr in (Show.start_time, Show.venue_id, Show.artist_id):
+    event.listen(_attr, 'set', _load_old_value, active_history=True)
+event.listen(Show, 'after_insert', _after_insert)
+event.listen(Show, 'after_delete', _after_delete)
+event.listen(Show, 'after_update', _after_update)
+
+
+def recount(connection, mark):
+    """Recompute every counter from Show in one UPDATE per table."""
+    for model, fk, _ in SIDES:
+        def count(*criteria):
+            return select(func.count(Show.id)).where(
+                fk == model.__table__.c.id, *criteria).scalar_subquery()
+        connection.execute(model.__table__.update().values(
+            upcoming_shows_count=count(Show.start_time > mark),
+            past_shows_count=count(Show.start_time <= mark)))
+
+
+def roll(now=None):
+    """Move shows that started since the last roll from upcoming to past.
+    Returns the number of shows moved."""
+    if now is None:
+        now = datetime.datetime.now()
+    connection = db.session.connection()
+    # Waits for show writes holding the shared lock, and holds theirs off.
+    state = db.session.query(ShowCounterState).with_for_update().one()
+    mark = state.rolled_at
+    if now <= mark:
+        db.session.rollback()
+        return 0
+    moved = {}
+    for model, fk, _ in SIDES:
+        rows = db.session.query(fk, func.count(Show.id)).filter(
+            Show.start_time > mark, Show.start_time <= now).group_by(fk).all()
+        table = model.__table__
+        for entity_id, n in rows:
+            connection.execute(table.update().where(table.c.id == entity_id).values(
+                upcoming_shows_count=table.c.upcoming_shows_count - n,
+                past_shows_count=table.c.past_shows_count + n))
+        moved[model] = sum(n for _, n in rows)
+    state.rolled_at = now
+    db.session.commit()
+    return moved[Venue]
+
+
+@jobs.job('roll-show-counters')
+def roll_job():
+    roll()
+
+
+def init_app(app):
+    interval = app.config.get('SHOW_COUNTERS_ROLL_INTERVAL', 300)
+    if not interval:
+        return
+    last = [time.monotonic()]
+    lock = threading.Lock()
+
+    @app.before_request
+    def schedule_roll():
+        now = time.monotonic()
+        if now - last[0] < interval:
+            return
+        with lock:
+            if now - last[0] < interval:
+                return
+            last[0] = now
+        jobs.enqueue('roll-show-counters')
+
+
+def mismatches():
+    """(model name, id, stored, recounted) for every counter that is off."""
+    mark = watermark(db.session.connection())
+    found = []
+    for model, fk, _ in SIDES:
+        upcoming = func.count(Show.id).filter(Show.start_time > mark)
+        past = func.count(Show.id).filter(Show.start_time <= mark)
+        rows = db.session.query(
+            model.id, model.upcoming_shows_count, model.past_shows_count,
+            upcoming, past).outerjoin(Show, fk == model.id).group_by(model.id)
+        for entity_id, stored_up, stored_past, up, past_n in rows:
+            if (stored_up, stored_past) != (up, past_n):
+                found.append((model.__name__, entity_id,
+                              (stored_up, stored_past), (up, past_n)))
+    return found
+
+
+@click.command('roll-show-counters')
+@with_appcontext
+def roll_show_counters():
+    """Move passed shows from the upcoming to the past counters."""
+    click.echo('Moved %d shows to past.' % roll())
+
+
+@click.command('check-show-counters')
+@click.option('--fix', is_flag=True, help='Rewrite all counters from a full recount.')
+@with_appcontext
+def check_show_counters(fix):
+    """Compare stored show counters with a full recount."""
+    found = mismatches()
+    for name, entity_id, stored, actual in found:
+        click.echo('%s %d: stored upcoming/past %s, recounted %s' % (
+            name, entity_id, stored, actual))
+    if fix:
+        recount(db.session.connection(), watermark(db.session.connection()))
+        db.session.commit()
+        click.echo('Recounted all show counters.')
+    elif found:
+        raise click.ClickException('%d counters out of date.' % len(found))
+    else:
+        click.echo('All show counters match.')
@@ -0,0 +1,103 @@
+#----------------------------------------------------------------------------#
+# Connection pool metrics.
+#
+# TimedQueuePool records how long each checkout waited for a connection;
+# pool events count connects, checkouts, checkins and invalidations. Numbers
+# are per process, so under gunicorn every worker reports its own pool
+# (the pid is included to tell them apart).
+#----------------------------------------------------------------------------#
+import os
+import threading
+import time
+
+from flask import jsonify
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool, QueuePool
+
+from models import db
+
+
+class PoolMetrics:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe_wait(self, seconds):
+        with self.lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, pool=None):
+        waits = self.checkouts or 1
+        stats = {'pid': os.getpid(),
+                 'connects': self.connects,
+                 'checkouts': self.checkouts,
+                 'checkins': self.checkins,
+                 'invalidations': self.invalidations,
+                 'timeouts': self.timeouts,
+                 'wait_avg_ms': self.wait_total / waits * 1000,
+                 'wait_max_ms': self.wait_max * 1000}
+        if isinstance(pool, QueuePool):
+            stats.update({'size': pool.size(),
+                          'checked_out': pool.checkedout(),
+                          'overflow': pool.overflow(),
+                          'checked_in': pool.checkedin()})
+        return stats
+
+
+metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.timeouts += 1
+            raise
+        finally:
+            metrics.observe_wait(time.perf_counter() - started)
+
+
+@event.listens_for(Pool, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    metrics.connects += 1
+
+
+@event.listens_for(Pool, 'checkout')
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    metrics.checkouts += 1
+
+
+@event.listens_for(Pool, 'checkin')
+def _on_checkin(dbapi_connection, connection_record):
+    metrics.checkins += 1
+
+
+@event.listens_for(Pool, 'invalidate')
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    metrics.invalidations += 1
+
+
+def init_app(app):
+    """Call before db.init_app(app) so the engine gets the timed pool."""
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    if 'pool_size' in options:
+        options.setdefault('poolclass', TimedQueuePool)
+
+    if app.config.get('EXPOSE_STATS'):
+        @app.route('/db/pool/stats')
+        def db_pool_stats():
+            return jsonify(metrics.snapshot(db.engine.pool))
@@ -1,15 +1,26 @@
+import os
+
 from fabric.api import local, settings, abort
-from fabric.contrib.console import confirm
+
+# The test suite, then the route benchmark on a synthetic SQLite dataset,
+# compared against the stored baseline when there is one.
+TESTS = "python -m pytest -q tests"
+BENCHMARK = "python benchmark.py routes --output bench_results.json"
+if os.path.exists("bench_baseline.json"):
+    BENCHMARK += " --compare bench_baseline.json"
 
 # prepare for deployment
 
+def build_assets():
+    # static/dist is committed with the deploy so the dyno serves it as built.
+    local("FLASK_APP=app.py flask build-assets")
+
+
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
-    if result.failed and not confirm("Tests failed. Continue?"):
-        abort("Aborted at user request.")
+        result = local(TESTS + " && " + BENCHMARK)
+    if result.failed:
+        abort("Tests failed.")
 
 
 def commit():
@@ -23,6 +34,7 @@ def push():
 
 def prepare():
     test()
+    build_assets()
     commit()
     push()
 
@@ -38,14 +50,13 @@ def heroku():
 
 
 def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+    local("heroku run " + BENCHMARK)
 
 
 def deploy():
     pull()
     test()
+    build_assets()
     commit()
     heroku()
     heroku_test()
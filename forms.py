@@ -1,21 +1,26 @@
 from datetime import datetime
 from flask_wtf import Form
-import sqlalchemy
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL, Regexp, Length
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField
+from wtforms.validators import DataRequired, InputRequired, AnyOf, URL, Regexp, Length, NumberRange
 
 class ShowForm(Form):
-    artist_id = StringField(
-        'artist_id'
+    artist_id = IntegerField(
+        'artist_id', validators=[InputRequired()]
     )
-    venue_id = StringField(
-        'venue_id'
+    venue_id = IntegerField(
+        'venue_id', validators=[InputRequired()]
     )
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
+        format=['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'],
         default= datetime.today()
     )
+    duration = IntegerField(
+        'duration',
+        validators=[InputRequired(), NumberRange(min=1, max=24 * 60, message='Duration must be between 1 and 1440 minutes.')],
+        default=120
+    )
 
 class VenueForm(Form):
     name = StringField(
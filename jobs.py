@@ -0,0 +1,254 @@
+#----------------------------------------------------------------------------#
+# In-process background jobs.
+#
+#   @jobs.job('reindex')
+#   def reindex(model_name, ids): ...
+#
+#   jobs.enqueue('reindex', 'Venue', [1, 2])
+#
+# A bounded queue feeds JOBS_WORKERS threads, each running its job in a
+# fresh app context. Failed jobs are retried with exponential backoff up to
+# JOBS_MAX_RETRIES times. When the queue is full, enqueue() waits up to
+# JOBS_ENQUEUE_TIMEOUT and then runs the job in the caller, which slows
+# producers down instead of dropping work. Jobs run on threads of the web
+# process, next to the memory they update (the search and typeahead
+# indexes); none are CPU-bound enough to be worth a process pool. On exit
+# the queue stops accepting work and drains for up to JOBS_SHUTDOWN_TIMEOUT
+# seconds.
+#----------------------------------------------------------------------------#
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from flask import jsonify
+
+logger = logging.getLogger(__name__)
+
+# name -> Job
+JOBS = {}
+
+
+class Job:
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+
+
+def job(name):
+    """Register a job function under name."""
+    def register(func):
+        JOBS[name] = Job(name, func)
+        return func
+    return register
+
+
+class JobMetrics:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.ran_inline = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+        self.by_name = {}
+
+    def observe(self, name, waited, ran, ok):
+        with self.lock:
+            if ok:
+                self.completed += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.run_total += ran
+            self.run_max = max(self.run_max, ran)
+            # Every attempt, retries included.
+            counts = self.by_name.setdefault(name, {'runs': 0, 'errors': 0})
+            counts['runs'] += 1
+            if not ok:
+                counts['errors'] += 1
+
+    def snapshot(self, depth, mode):
+        runs = sum(c['runs'] for c in self.by_name.values()) or 1
+        return {'pid': os.getpid(),
+                'mode': mode,
+                'depth': depth,
+                'enqueued': self.enqueued,
+                'completed': self.completed,
+                'failed': self.failed,
+                'retried': self.retried,
+                'ran_inline': self.ran_inline,
+                'wait_avg_ms': self.wait_total / runs * 1000,
+                'wait_max_ms': self.wait_max * 1000,
+                'run_avg_ms': self.run_total / runs * 1000,
+                'run_max_ms': self.run_max * 1000,
+                'jobs': self.by_name}
+
+
+_STOP = object()
+
+class JobQueue:
+
+    def __init__(self):
+        self.app = None
+        self.mode = 'inline'
+        self.queue = None
+        self.threads = []
+        self.timers = set()
+        self.accepting = False
+        self.pid = None
+        self.start_lock = threading.Lock()
+        self.metrics = JobMetrics()
+
+    def init_app(self, app):
+        self.app = app
+        self.mode = app.config.get('JOBS_MODE', 'thread')
+        self.max_retries = app.config.get('JOBS_MAX_RETRIES', 3)
+        self.retry_delay = app.config.get('JOBS_RETRY_DELAY', 0.5)
+        self.enqueue_timeout = app.config.get('JOBS_ENQUEUE_TIMEOUT', 0.5)
+        self.shutdown_timeout = app.config.get('JOBS_SHUTDOWN_TIMEOUT', 10)
+        app.extensions['jobs'] = self
+
+        if app.config.get('EXPOSE_STATS'):
+            @app.route('/jobs/stats')
+            def jobs_stats():
+                return jsonify(self.stats())
+
+        if self.mode == 'inline':
+            return
+        self.queue_size = app.config.get('JOBS_QUEUE_SIZE', 1000)
+        self.workers = app.config.get('JOBS_WORKERS', 4)
+        self.accepting = True
+        atexit.register(self.shutdown)
+
+    def _start(self):
+        # Workers start with the first job, in the process that enqueues it:
+        # threads created before a gunicorn fork would not survive it.
+        with self.start_lock:
+            if self.pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.queue_size)
+            self.threads = []
+            self.timers = set()
+            for n in range(self.workers):
+                thread = threading.Thread(target=self._work, name='job-worker-%d' % n,
+                                          daemon=True)
+                thread.start()
+                self.threads.append(thread)
+            self.pid = os.getpid()
+
+    def stats(self):
+        return self.metrics.snapshot(self.queue.qsize() if self.queue else 0, self.mode)
+
+    def enqueue(self, name, *args, **kwargs):
+        if name not in JOBS:
+            raise KeyError('unknown job %r' % name)
+        with self.metrics.lock:
+            self.metrics.enqueued += 1
+        item = (name, args, kwargs, 0, time.perf_counter())
+        if not self.accepting:
+            self._run_inline(item)
+            return
+        if self.pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put(item, timeout=self.enqueue_timeout)
+        except queue.Full:
+            logger.warning('job queue full, running %s inline', name)
+            self._run_inline(item)
+
+    def _run_inline(self, item):
+        with self.metrics.lock:
+            self.metrics.ran_inline += 1
+        # No retries here: the caller is waiting.
+        self._run(item, retry=False)
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._run(item, retry=True)
+            finally:
+                self.queue.task_done()
+
+    def _run(self, item, retry):
+        name, args, kwargs, attempt, enqueued_at = item
+        started = time.perf_counter()
+        ok = False
+        try:
+            with self.app.app_context():
+                JOBS[name].func(*args, **kwargs)
+            ok = True
+        except Exception:
+            if retry and attempt < self.max_retries and self.accepting:
+                logger.warning('job %s failed (attempt %d), retrying', name,
+                               attempt + 1, exc_info=True)
+                self._retry_later((name, args, kwargs, attempt + 1, enqueued_at),
+                                  self.retry_delay * 2 ** attempt)
+            else:
+                with self.metrics.lock:
+                    self.metrics.failed += 1
+                logger.exception('job %s failed', name)
+        finally:
+            self.metrics.observe(name, started - enqueued_at,
+                                 time.perf_counter() - started, ok)
+
+    def _retry_later(self, item, delay):
+        with self.metrics.lock:
+            self.metrics.retried += 1
+
+        def put():
+            self.timers.discard(timer)
+            if self.accepting:
+                try:
+                    self.queue.put(item, timeout=self.enqueue_timeout)
+                    return
+                except queue.Full:
+                    logger.warning('job queue full, retrying %s inline', item[0])
+            self._run_inline(item)
+        timer = threading.Timer(delay, put)
+        timer.daemon = True
+        self.timers.add(timer)
+        timer.start()
+
+    def shutdown(self, timeout=None):
+        """Stop accepting jobs and let the workers drain the queue."""
+        if not self.accepting:
+            return
+        self.accepting = False
+        if self.pid != os.getpid():
+            return
+        if timeout is None:
+            timeout = self.shutdown_timeout
+        deadline = time.monotonic() + timeout
+        for timer in list(self.timers):
+            timer.cancel()
+        if self.timers:
+            logger.warning('job queue shut down with %d retries pending', len(self.timers))
+        for _ in self.threads:
+            try:
+                self.queue.put(_STOP, timeout=max(0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in self.threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        left = self.queue.qsize()
+        if left:
+            logger.warning('job queue shut down with %d jobs left', left)
+        self.threads = []
+
+
+jobs = JobQueue()
+enqueue = jobs.enqueue
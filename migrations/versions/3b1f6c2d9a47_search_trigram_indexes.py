@@ -0,0 +1,37 @@
+"""search trigram indexes
+
+Revision ID: 3b1f6c2d9a47
+Revises: 059dcf43b7b6
+Create Date: 2026-10-18 13:40:02.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f6c2d9a47'
+down_revision = '059dcf43b7b6'
+branch_labels = None
+depends_on = None
+
+SEARCH_COLUMNS = ('name', 'city', 'state', 'genres')
+
+
+def upgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    if postgresql:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in ('Venue', 'Artist'):
+        for column in SEARCH_COLUMNS:
+            op.create_index('ix_{}_{}_trgm'.format(table, column), table,
+                            [column], unique=False,
+                            postgresql_using='gin',
+                            postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    for table in ('Venue', 'Artist'):
+        for column in SEARCH_COLUMNS:
+            op.drop_index('ix_{}_{}_trgm'.format(table, column),
+                          table_name=table)
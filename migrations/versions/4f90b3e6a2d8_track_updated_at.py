@@ -0,0 +1,33 @@
+"""track updated_at
+
+Revision ID: 4f90b3e6a2d8
+Revises: c5d27e9b0f16
+Create Date: 2026-10-18 15:05:13.402771
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f90b3e6a2d8'
+down_revision = 'c5d27e9b0f16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite can't ALTER in a column with a non-constant default, so the
+    # batch operations rebuild the tables there.
+    recreate = 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+    for table in ('Venue', 'Artist', 'Show'):
+        with op.batch_alter_table(table, recreate=recreate) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(),
+                                          server_default=sa.func.now(),
+                                          nullable=False))
+
+
+def downgrade():
+    for table in ('Show', 'Artist', 'Venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,46 @@
+"""show end_time and artist area index
+
+Revision ID: 6b2e91d07f5a
+Revises: d3b8f27a19c4
+Create Date: 2026-10-18 18:04:37.290615
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b2e91d07f5a'
+down_revision = 'd3b8f27a19c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.add_column(sa.Column('end_time', sa.DateTime(), nullable=True))
+    op.create_index('ix_Artist_state_city', 'Artist', ['state', 'city'], unique=False)
+
+    bind = op.get_bind()
+    show = sa.table('Show', sa.column('id'), sa.column('start_time', sa.DateTime()),
+                    sa.column('duration'), sa.column('end_time', sa.DateTime()))
+    if bind.dialect.name == 'postgresql':
+        op.execute(show.update().values(
+            end_time=show.c.start_time + show.c.duration * sa.text("interval '1 minute'")))
+        return
+    rows = bind.execute(sa.select(show.c.id, show.c.start_time, show.c.duration).where(
+        show.c.start_time.isnot(None))).fetchall()
+    if rows:
+        bind.execute(show.update().where(show.c.id == sa.bindparam('show_id')).values(
+            end_time=sa.bindparam('new_end_time')), [
+            {'show_id': r.id,
+             'new_end_time': r.start_time + datetime.timedelta(minutes=r.duration)}
+            for r in rows])
+
+
+def downgrade():
+    op.drop_index('ix_Artist_state_city', table_name='Artist')
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.drop_column('end_time')
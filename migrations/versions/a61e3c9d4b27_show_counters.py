@@ -0,0 +1,55 @@
+"""materialized show counters
+
+Revision ID: a61e3c9d4b27
+Revises: 4f90b3e6a2d8
+Create Date: 2026-10-18 16:42:08.117305
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a61e3c9d4b27'
+down_revision = '4f90b3e6a2d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('upcoming_shows_count', sa.Integer(),
+                                          server_default='0', nullable=False))
+            batch_op.add_column(sa.Column('past_shows_count', sa.Integer(),
+                                          server_default='0', nullable=False))
+    state = op.create_table('ShowCounterState',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('rolled_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    now = datetime.datetime.now()
+    op.bulk_insert(state, [{'id': 1, 'rolled_at': now}])
+    show = sa.table('Show', sa.column('id'), sa.column('venue_id'),
+                    sa.column('artist_id'), sa.column('start_time'))
+    for table, fk in (('Venue', show.c.venue_id), ('Artist', show.c.artist_id)):
+        target = sa.table(table, sa.column('id'), sa.column('upcoming_shows_count'),
+                          sa.column('past_shows_count'))
+
+        def count(criterion):
+            return sa.select(sa.func.count(show.c.id)).where(
+                fk == target.c.id, criterion).scalar_subquery()
+        op.execute(target.update().values(
+            upcoming_shows_count=count(show.c.start_time > now),
+            past_shows_count=count(show.c.start_time <= now)))
+
+
+def downgrade():
+    op.drop_table('ShowCounterState')
+    for table in ('Artist', 'Venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('past_shows_count')
+            batch_op.drop_column('upcoming_shows_count')
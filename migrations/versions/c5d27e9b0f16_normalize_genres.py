@@ -0,0 +1,90 @@
+"""normalize genres
+
+Revision ID: c5d27e9b0f16
+Revises: 8e4a0d51c7f3
+Create Date: 2026-10-18 14:31:55.870412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d27e9b0f16'
+down_revision = '8e4a0d51c7f3'
+branch_labels = None
+depends_on = None
+
+# (entity table, association table, association foreign key)
+GENRE_LINKS = (('Venue', 'Venue_Genre', 'venue_id'),
+               ('Artist', 'Artist_Genre', 'artist_id'))
+
+
+def upgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    genre = op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index('ix_Genre_name_trgm', 'Genre', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    for table, link_table, fk in GENRE_LINKS:
+        op.create_table(link_table,
+        sa.Column(fk, sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([fk], [table + '.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint(fk, 'genre_id')
+        )
+        op.create_index('ix_{}_genre_id_{}'.format(link_table, fk), link_table,
+                        ['genre_id', fk], unique=False)
+
+    # Split the comma-joined strings into Genre rows and links.
+    conn = op.get_bind()
+    genre_ids = {}
+    for table, link_table, fk in GENRE_LINKS:
+        links = []
+        rows = conn.execute(sa.text(
+            'SELECT id, genres FROM "{}" WHERE genres IS NOT NULL'.format(table)))
+        for entity_id, genres in rows.fetchall():
+            for name in dict.fromkeys(g.strip() for g in genres.split(',')):
+                if not name:
+                    continue
+                if name not in genre_ids:
+                    genre_ids[name] = conn.execute(
+                        genre.insert().values(name=name)).inserted_primary_key[0]
+                links.append({fk: entity_id, 'genre_id': genre_ids[name]})
+        if links:
+            link = sa.table(link_table, sa.column(fk), sa.column('genre_id'))
+            op.bulk_insert(link, links)
+
+    for table, link_table, fk in GENRE_LINKS:
+        op.drop_index('ix_{}_genres_trgm'.format(table), table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('genres')
+
+
+def downgrade():
+    conn = op.get_bind()
+    for table, link_table, fk in GENRE_LINKS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('genres', sa.String(), nullable=True))
+        op.create_index('ix_{}_genres_trgm'.format(table), table, ['genres'],
+                        unique=False, postgresql_using='gin',
+                        postgresql_ops={'genres': 'gin_trgm_ops'})
+        joined = {}
+        rows = conn.execute(sa.text(
+            'SELECT l.{0}, g.name FROM "{1}" l JOIN "Genre" g ON g.id = l.genre_id '
+            'ORDER BY l.{0}, g.name'.format(fk, link_table)))
+        for entity_id, name in rows.fetchall():
+            joined.setdefault(entity_id, []).append(name)
+        for entity_id, names in joined.items():
+            conn.execute(sa.text(
+                'UPDATE "{}" SET genres = :genres WHERE id = :id'.format(table)),
+                {'genres': ','.join(names), 'id': entity_id})
+        op.drop_index('ix_{}_genre_id_{}'.format(link_table, fk), table_name=link_table)
+        op.drop_table(link_table)
+    op.drop_index('ix_Genre_name_trgm', table_name='Genre')
+    op.drop_table('Genre')
@@ -0,0 +1,42 @@
+"""show duration and booking conflict constraints
+
+Revision ID: d3b8f27a19c4
+Revises: a61e3c9d4b27
+Create Date: 2026-10-18 17:20:51.638914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3b8f27a19c4'
+down_revision = 'a61e3c9d4b27'
+branch_labels = None
+depends_on = None
+
+# Start time is timestamp without time zone, so the ranges are tsrange.
+DURING = "tsrange(start_time, start_time + duration * interval '1 minute')"
+
+
+def upgrade():
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.add_column(sa.Column('duration', sa.Integer(), server_default='120',
+                                      nullable=False,
+                                      comment='Length of the booking in minutes.'))
+
+    if op.get_bind().dialect.name == 'postgresql':
+        # Fails if existing bookings already overlap; resolve those first.
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        for name, column in (('ex_Show_venue_during', 'venue_id'),
+                             ('ex_Show_artist_during', 'artist_id')):
+            op.execute('ALTER TABLE "Show" ADD CONSTRAINT "{0}" EXCLUDE USING gist '
+                       '({1} WITH =, ({2}) WITH &&)'.format(name, column, DURING))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE "Show" DROP CONSTRAINT "ex_Show_artist_during"')
+        op.execute('ALTER TABLE "Show" DROP CONSTRAINT "ex_Show_venue_during"')
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.drop_column('duration')
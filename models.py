@@ -1,17 +1,68 @@
-from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate 
-from flask_moment import Moment
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, object_session
 import datetime
 
-db = SQLAlchemy()
+from routing import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def trgm_indexes(table, *columns):
+    # GIN trigram indexes backing ILIKE/similarity search on PostgreSQL
+    # (see search.py and the pg_trgm migration).
+    return tuple(db.Index('ix_{}_{}_trgm'.format(table, c), c,
+                          postgresql_using='gin',
+                          postgresql_ops={c: 'gin_trgm_ops'})
+                 for c in columns)
+
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+    __table_args__ = trgm_indexes('Genre', 'name')
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self):
+        return '<Genre %r>' % self.name
+
+    @classmethod
+    def from_names(cls, names):
+        # Get-or-create the genres for a form's genre list in one query.
+        names = list(dict.fromkeys(n.strip() for n in names if n.strip()))
+        found = {g.name: g for g in cls.query.filter(cls.name.in_(names)).all()}
+        return [found.get(n) or cls(name=n) for n in names]
+
+
+venue_genres = db.Table(
+    'Venue_Genre',
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Index('ix_Venue_Genre_genre_id_venue_id', 'genre_id', 'venue_id'))
+
+artist_genres = db.Table(
+    'Artist_Genre',
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Index('ix_Artist_Genre_genre_id_artist_id', 'genre_id', 'artist_id'))
+
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = trgm_indexes('Venue', 'name', 'city', 'state') + (
+        db.Index('ix_Venue_state_city', 'state', 'city'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
-    genres = db.Column(db.String)
+    # selectin keeps genre loading at one extra query per batch of venues
+    genres = db.relationship('Genre', secondary=venue_genres, lazy='selectin',
+                             order_by=Genre.name)
     city = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
@@ -21,6 +72,14 @@ class Venue(db.Model):
     state = db.Column(db.String(120))
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
+    updated_at = db.Column(db.DateTime(), nullable=False,
+                           default=datetime.datetime.now,
+                           server_default=db.func.now())
+    # Maintained by counters.py relative to ShowCounterState.rolled_at.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0,
+                                     server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0,
+                                 server_default='0')
     
     def add(self):
         db.session.add(self)
@@ -37,11 +96,26 @@ class Venue(db.Model):
     def __repr__(self):
         return '<Venue %r>' % self.id
 
+    @property
+    def genre_names(self):
+        return [g.name for g in self.genres]
+
+    @classmethod
+    def version(cls, venue_id, session=None):
+        # Everything show_venue renders depends on: the venue row, its shows,
+        # their artists and how many of them are still upcoming.
+        session = session or db.session
+        updated_at = session.query(cls.updated_at).filter(
+            cls.id == venue_id).scalar()
+        if updated_at is None:
+            return None
+        return (updated_at,) + Show.version_of(Show.venue_id == venue_id, Artist, session)
+
     @property
     def srlz(self):
         return {'id': self.id,
                 'name': self.name,
-                'genres': self.genres,
+                'genres': self.genre_names,
                 'city': self.city,
                 'state': self.state,
                 'phone': self.phone,'address': self.address,
@@ -49,27 +123,7 @@ class Venue(db.Model):
                 'facebook_link': self.facebook_link,
                 'website': self.website,
                 'seeking_talent': self.seeking_talent,
-                'seeking_description': self.seeking_description,
-                'genres': self.genres                
-                }
-
-    @property
-    def srlz_upcoming_shows_count(self):
-        return {'id': self.id,
-                'name': self.name,
-                'city': self.city,
-                'state': self.state,
-                'phone': self.phone,
-                'genres': self.genres,
-                'facebook_link': self.facebook_link,
-                'website': self.website,
-                'seeking_talent': self.seeking_talent,
-                'seeking_description': self.seeking_description,
-                'address': self.address,
-                'image_link': self.image_link,
-                'num_shows': Show.query.join(Venue).filter(
-                    Show.start_time > datetime.datetime.now(),
-                    Show.artist_id == self.id)
+                'seeking_description': self.seeking_description
                 }
 
     @property
@@ -79,38 +133,44 @@ class Venue(db.Model):
                 'city': self.city,
                 'state': self.state,
                 'phone': self.phone,
-                'genres': self.genres,
+                'genres': self.genre_names,
                 'address': self.address,
                 'image_link': self.image_link,
                 'facebook_link': self.facebook_link,
                 'seeking_talent': self.seeking_talent,
                 'seeking_description': self.seeking_description,
                 'website': self.website,
-                'upcoming_shows': [show.srlz_artist_venue for show in Show.query.filter(
-                    Show.start_time > datetime.datetime.now(),
-                    Show.venue_id == self.id).all()],
-                'past_shows': [show.srlz_artist_venue for show in Show.query.filter(
-                    Show.start_time < datetime.datetime.now(),
-                    Show.venue_id == self.id).all()],
-                'upcoming_shows_count': len(Show.query.join(Venue).filter(
-                    Show.start_time > datetime.datetime.now(),
-                    Show.venue_id == self.id).all()),
-                'past_shows_count': len(Show.query.join(Venue).filter(
-                    Show.start_time < datetime.datetime.now(),
-                    Show.venue_id == self.id).all())
+                **Show.partition(Show.venue_id == self.id,
+                                 session=object_session(self))
                 }
 
-    @property
-    def filter_city_state(self):
-        return {'city': self.city,
-                'state': self.state,
-                'venues': [v.srlz_upcoming_shows_count
-                           for v in Venue.query.filter(Venue.city == self.city,
-                                                       Venue.state == self.state).all()]}
+    @classmethod
+    def srlz_areas(cls, genre=None, session=None):
+        # One query for every venue with its stored upcoming show counter
+        # (see counters.py), then a single pass to bucket the rows by
+        # (city, state).
+        query = (session or db.session).query(cls)
+        if genre:
+            query = query.join(cls.genres).filter(Genre.name == genre)
+        areas = {}
+        for venue in query.order_by(cls.state, cls.city, cls.id).all():
+            area = areas.get((venue.city, venue.state))
+            if area is None:
+                area = areas[(venue.city, venue.state)] = {
+                    'city': venue.city,
+                    'state': venue.state,
+                    'venues': []}
+            ven = venue.srlz
+            ven['num_shows'] = venue.upcoming_shows_count
+            area['venues'].append(ven)
+        return list(areas.values())
 
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = trgm_indexes('Artist', 'name', 'city', 'state') + (
+        db.Index('ix_Artist_state_city', 'state', 'city'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -118,12 +178,21 @@ class Artist(db.Model):
     state = db.Column(db.String(120))
     address = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
+    genres = db.relationship('Genre', secondary=artist_genres, lazy='selectin',
+                             order_by=Genre.name)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
+    updated_at = db.Column(db.DateTime(), nullable=False,
+                           default=datetime.datetime.now,
+                           server_default=db.func.now())
+    # Maintained by counters.py relative to ShowCounterState.rolled_at.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0,
+                                     server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0,
+                                 server_default='0')
     
 
 
@@ -142,6 +211,19 @@ class Artist(db.Model):
     def __repr__(self):
         return '<Artist %r>' % self.id
 
+    @property
+    def genre_names(self):
+        return [g.name for g in self.genres]
+
+    @classmethod
+    def version(cls, artist_id, session=None):
+        session = session or db.session
+        updated_at = session.query(cls.updated_at).filter(
+            cls.id == artist_id).scalar()
+        if updated_at is None:
+            return None
+        return (updated_at,) + Show.version_of(Show.artist_id == artist_id, Venue, session)
+
     @property
     def srlz_shows_details(self):
         return {'id': self.id,
@@ -149,24 +231,28 @@ class Artist(db.Model):
                 'city': self.city,
                 'state': self.state,
                 'phone': self.phone,
-                'genres': self.genres,
+                'genres': self.genre_names,
                 'image_link': self.image_link,
                 'facebook_link': self.facebook_link,
                 'seeking_venue': self.seeking_venue,
                 'seeking_description': self.seeking_description,
                 'website': self.website,
-                'upcoming_shows': [show.srlz_artist_venue for show in Show.query.filter(
-                    Show.start_time > datetime.datetime.now(),
-                    Show.artist_id == self.id).all()],
-                'past_shows': [show.srlz_artist_venue for show in Show.query.filter(
-                    Show.start_time < datetime.datetime.now(),
-                    Show.artist_id == self.id).all()],
-                'upcoming_shows_count': len(Show.query.join(Artist).filter(
-                    Show.start_time > datetime.datetime.now(),
-                    Show.artist_id == self.id).all()),
-                'past_shows_count': len(Show.query.join(Artist).filter(
-                    Show.start_time < datetime.datetime.now(),
-                    Show.artist_id == self.id).all())
+                **Show.partition(Show.artist_id == self.id,
+                                 session=object_session(self))
+                }
+
+    @classmethod
+    def srlz_page(cls, after_id=0, limit=50, genre=None, session=None):
+        # Keyset pagination over the primary key; only the columns the
+        # listing shows are selected. One extra row tells us if there is
+        # a next page.
+        query = (session or db.session).query(cls.id, cls.name).filter(cls.id > after_id)
+        if genre:
+            query = query.join(cls.genres).filter(Genre.name == genre)
+        rows = query.order_by(cls.id).limit(limit + 1).all()
+        next_id = rows[limit - 1].id if len(rows) > limit else None
+        return {'artists': [{'id': r.id, 'name': r.name} for r in rows[:limit]],
+                'next_id': next_id
                 }
 
     @property
@@ -176,7 +262,7 @@ class Artist(db.Model):
                 'city': self.city,
                 'state': self.state,
                 'phone': self.phone,
-                'genres': self.genres,
+                'genres': self.genre_names,
                 'image_link': self.image_link,
                 'facebook_link': self.facebook_link,
                 'website': self.website,
@@ -185,11 +271,42 @@ class Artist(db.Model):
                 }
 
 
+DEFAULT_SHOW_MINUTES = 120
+# Longest booking ShowForm and the importer accept; it bounds how far back
+# an overlap search has to look.
+MAX_SHOW_MINUTES = 24 * 60
+
+
+def show_end_time(context):
+    # Column default, so Core bulk inserts get end_time as well.
+    params = context.get_current_parameters()
+    if params.get('start_time') is None:
+        return None
+    return params['start_time'] + datetime.timedelta(
+        minutes=params.get('duration') or DEFAULT_SHOW_MINUTES)
+
+
 class Show(db.Model):
     __tablename__ = 'Show'
+    __table_args__ = (
+        # Detail pages filter on (venue_id|artist_id, start_time); /shows
+        # and the upcoming counts range over start_time alone. The first two
+        # also serve the booking conflict check. On PostgreSQL the
+        # ex_Show_venue_during/ex_Show_artist_during exclusion constraints
+        # (see migrations) enforce it.
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Show_start_time', 'start_time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     start_time = db.Column(db.DateTime())
+    duration = db.Column(db.Integer, nullable=False,
+                         default=DEFAULT_SHOW_MINUTES,
+                         server_default=str(DEFAULT_SHOW_MINUTES),
+                         comment='Length of the booking in minutes.')
+    # start_time + duration, stored so overlap checks can compare it in SQL.
+    end_time = db.Column(db.DateTime(), default=show_end_time)
     venue_id = db.Column(db.Integer, db.ForeignKey(
         'Venue.id'), nullable=False)
     venue = db.relationship(
@@ -198,6 +315,9 @@ class Show(db.Model):
         'Artist.id'), nullable=False)
     artist = db.relationship(
         'Artist', backref=db.backref('shows', cascade='all, delete'))
+    updated_at = db.Column(db.DateTime(), nullable=False,
+                           default=datetime.datetime.now,
+                           server_default=db.func.now())
 
     def add(self):
         db.session.add(self)
@@ -214,25 +334,159 @@ class Show(db.Model):
     def __repr__(self):
         return '<Show %r>' % self.id
 
+    _overlapping_bookings = {}
+
+    @classmethod
+    def _overlapping_booking(cls, key):
+        # Built once per side; conflicts() is on the booking hot path and
+        # only the bound values change between calls.
+        if key not in cls._overlapping_bookings:
+            column = getattr(cls, key)
+            cls._overlapping_bookings[key] = db.select(cls.id).where(
+                column == db.bindparam('entity_id'),
+                cls.start_time < db.bindparam('end_time'),
+                cls.start_time > db.bindparam('earliest_start'),
+                cls.end_time > db.bindparam('start_time'),
+                cls.id != db.bindparam('exclude_id')
+            ).order_by(cls.start_time)
+        return cls._overlapping_bookings[key]
+
+    @classmethod
+    def conflicts(cls, venue_id, artist_id, start_time, duration, exclude_id=None):
+        # Bookings of the venue or the artist overlapping
+        # [start_time, start_time + duration). No booking is longer than
+        # MAX_SHOW_MINUTES, so only those starting at most that long before
+        # can reach into the window: a bounded range seek per side on
+        # (venue_id|artist_id, start_time), however many shows there are.
+        # It doesn't assume existing bookings are free of overlaps, which
+        # only PostgreSQL's exclusion constraints guarantee.
+        end_time = start_time + datetime.timedelta(minutes=duration)
+        earliest = start_time - datetime.timedelta(minutes=MAX_SHOW_MINUTES)
+        found = []
+        for key, value in (('venue_id', venue_id), ('artist_id', artist_id)):
+            ids = db.session.execute(cls._overlapping_booking(key), {
+                'entity_id': value, 'start_time': start_time, 'end_time': end_time,
+                'earliest_start': earliest, 'exclude_id': exclude_id or 0}).scalars()
+            for show_id in ids:
+                show = db.session.get(cls, show_id)
+                if show not in found:
+                    found.append(show)
+        return found
+
+    @classmethod
+    def query_artist_venue(cls, session=None):
+        # Artist and venue come back in the same SELECT so that
+        # srlz_artist_venue never has to go back to the database.
+        return (session or db.session).query(cls).options(joinedload(cls.artist), joinedload(cls.venue))
+
+    @classmethod
+    def window(cls, when='upcoming', start=None, end=None, now=None):
+        # Criteria for the shows in a time window: 'upcoming', 'past' or
+        # 'all', optionally narrowed to [start, end).
+        if now is None:
+            now = datetime.datetime.now()
+        criteria = []
+        if when == 'upcoming':
+            criteria.append(cls.start_time > now)
+        elif when == 'past':
+            criteria.append(cls.start_time <= now)
+        if start is not None:
+            criteria.append(cls.start_time >= start)
+        if end is not None:
+            criteria.append(cls.start_time < end)
+        return criteria
+
+    @classmethod
+    def version_of(cls, criterion, other, session=None):
+        # (count, latest show change, latest change to the other side,
+        # upcoming count) for the shows matching criterion; deletions and
+        # shows moving into the past change it too.
+        now = datetime.datetime.now()
+        row = (session or db.session).query(
+            db.func.count(cls.id),
+            db.func.max(cls.updated_at),
+            db.func.max(other.updated_at),
+            db.func.sum(db.case((cls.start_time > now, 1), else_=0))
+        ).join(other).filter(criterion).one()
+        return tuple(row)
+
+    @classmethod
+    def partition(cls, criterion, now=None, session=None):
+        # Fetch the matching shows once and split them around a single
+        # reference time, so a show lands in exactly one bucket.
+        if now is None:
+            now = datetime.datetime.now()
+        upcoming_shows = []
+        past_shows = []
+        for show in cls.query_artist_venue(session).filter(criterion).order_by(
+                cls.start_time).all():
+            if show.start_time > now:
+                upcoming_shows.append(show.srlz_artist_venue)
+            else:
+                past_shows.append(show.srlz_artist_venue)
+        return {'upcoming_shows': upcoming_shows,
+                'past_shows': past_shows,
+                'upcoming_shows_count': len(upcoming_shows),
+                'past_shows_count': len(past_shows)
+                }
+
     @property
     def srlz(self):
         return {'id': self.id,
-                'start_time': self.start_time.strftime("%m/%d/%Y, %H:%M:%S"),
+                'start_time': self.start_time,
+                'duration': self.duration,
                 'venue_id': self.venue_id,
                 'artist_id': self.artist_id
                 }
 
     @property
     def srlz_artist_venue(self):
+        venue = self.venue
+        artist = self.artist
         return {'id': self.id,
-                'start_time': self.start_time.strftime("%m/%d/%Y, %H:%M:%S"),
+                'start_time': self.start_time,
+                'duration': self.duration,
                 'venue_id': self.venue_id,
                 'artist_id': self.artist_id,
-                'venue': [v.srlz for v in Venue.query.filter(Venue.id == self.venue_id).all()][0],
-                'artist': [a.srlz for a in Artist.query.filter(Artist.id == self.artist_id).all()][0],
-                'artist_name' : Artist.query.join(Show).filter(self.artist_id == Artist.id).all()[0].name,
-                'artist_name_new' : Artist.query.join(Show).filter(self.artist_id == Artist.id).all()[0].name,
-                'artist_image_link' : Artist.query.join(Show).filter(self.artist_id == Artist.id).all()[0].image_link,
-                'venue_name' : Venue.query.join(Show).filter(self.venue_id == Venue.id).all()[0].name,
-                'venue_image_link' : Venue.query.join(Show).filter(self.venue_id == Venue.id).all()[0].image_link,
+                'venue': venue.srlz,
+                'artist': artist.srlz,
+                'artist_name' : artist.name,
+                'artist_image_link' : artist.image_link,
+                'venue_name' : venue.name,
+                'venue_image_link' : venue.image_link,
                 }
+
+
+class ShowCounterState(db.Model):
+    __tablename__ = 'ShowCounterState'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Shows starting after this are counted as upcoming, the rest as past.
+    rolled_at = db.Column(db.DateTime(), nullable=False)
+
+    def __repr__(self):
+        return '<ShowCounterState %r>' % self.rolled_at
+
+
+@event.listens_for(ShowCounterState.__table__, 'after_create')
+def _create_counter_state(target, connection, **kw):
+    # Same row the migration inserts, for databases built with create_all().
+    connection.execute(target.insert().values(id=1, rolled_at=datetime.datetime.now()))
+
+
+def touch(mapper, connection, target):
+    # Also fires when only a relationship (e.g. genres) changed, so
+    # updated_at covers those edits as well.
+    target.updated_at = datetime.datetime.now()
+
+
+for model in (Venue, Artist, Show):
+    event.listen(model, 'before_update', touch)
+
+
+def update_end_time(mapper, connection, target):
+    if target.start_time is not None:
+        target.end_time = target.start_time + datetime.timedelta(minutes=target.duration)
+
+
+event.listen(Show, 'before_update', update_end_time)
@@ -0,0 +1,141 @@
+#----------------------------------------------------------------------------#
+# Logging and per-request profiling.
+#
+# Logs are written as one JSON object per line to LOG_FILE. With PROFILING
+# on, every request also records its query count, total DB time, slowest
+# statements and template render time, returns them in a Server-Timing
+# header and logs them; requests over QUERY_COUNT_THRESHOLD queries or
+# SLOW_REQUEST_MS are logged as warnings.
+#----------------------------------------------------------------------------#
+import json
+import logging
+import time
+
+from flask import g, has_app_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {'time': self.formatTime(record),
+                 'level': record.levelname,
+                 'message': record.getMessage(),
+                 'logger': record.name,
+                 'where': '%s:%d' % (record.pathname, record.lineno)}
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestProfile:
+
+    def __init__(self, keep):
+        self.started = time.perf_counter()
+        self.keep = keep
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest = []
+        self.template_time = 0.0
+
+    def add_query(self, statement, seconds):
+        self.queries += 1
+        self.db_time += seconds
+        self.slowest.append((seconds, statement))
+        if len(self.slowest) > self.keep:
+            self.slowest.sort(key=lambda s: s[0], reverse=True)
+            del self.slowest[self.keep:]
+
+
+def _profile():
+    if has_app_context():
+        return g.get('profile')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is dropped with the statement
+    # even when it raises.
+    if _profile() is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _profile()
+    started = getattr(context, '_query_started', None)
+    if profile is not None and started is not None:
+        profile.add_query(statement, time.perf_counter() - started)
+
+
+def _before_render(sender, template, context, **extra):
+    profile = _profile()
+    if profile is not None:
+        g.render_started = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    profile = _profile()
+    if profile is not None and 'render_started' in g:
+        profile.template_time += time.perf_counter() - g.pop('render_started')
+
+
+def init_logging(app):
+    handler = logging.FileHandler(app.config.get('LOG_FILE', 'error.log'))
+    handler.setFormatter(JsonFormatter())
+    level = app.config.get('LOG_LEVEL', 'INFO')
+    handler.setLevel(level)
+    app.logger.setLevel(level)
+    app.logger.addHandler(handler)
+
+
+def init_app(app):
+    if not app.debug:
+        init_logging(app)
+    if not app.config.get('PROFILING'):
+        return
+
+    keep = app.config.get('PROFILING_SLOWEST', 3)
+    max_queries = app.config.get('QUERY_COUNT_THRESHOLD', 20)
+    slow_ms = app.config.get('SLOW_REQUEST_MS', 500)
+
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_profile():
+        g.profile = RequestProfile(keep)
+
+    @app.after_request
+    def finish_profile(response):
+        # Streamed bodies are produced after this runs, so their queries
+        # and rendering are not counted here.
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        total_ms = (time.perf_counter() - profile.started) * 1000
+        db_ms = profile.db_time * 1000
+        tpl_ms = profile.template_time * 1000
+        response.headers.add('Server-Timing', 'db;dur=%.1f;desc="%d queries"' % (db_ms, profile.queries))
+        response.headers.add('Server-Timing', 'tpl;dur=%.1f' % tpl_ms)
+        response.headers.add('Server-Timing', 'total;dur=%.1f' % total_ms)
+
+        over = profile.queries > max_queries or total_ms > slow_ms
+        fields = {'route': request.url_rule.rule if request.url_rule else None,
+                  'method': request.method,
+                  'path': request.full_path,
+                  'status': response.status_code,
+                  'queries': profile.queries,
+                  'db_ms': round(db_ms, 2),
+                  'template_ms': round(tpl_ms, 2),
+                  'total_ms': round(total_ms, 2),
+                  'over_threshold': over}
+        if over:
+            fields['slowest'] = [{'ms': round(s * 1000, 2), 'statement': stmt[:500]}
+                                 for s, stmt in sorted(profile.slowest, reverse=True)]
+        app.logger.log(logging.WARNING if over else logging.INFO,
+                       'request profile', extra={'fields': fields})
+        return response
@@ -0,0 +1,86 @@
+#----------------------------------------------------------------------------#
+# Read/write splitting over read replicas (DATABASE_REPLICA_URLS).
+#
+# Each replica becomes a bind ('replica0', 'replica1', ...). A GET or HEAD
+# request picks one at random and db.session reads from it. Everything else
+# uses the primary: other methods (form posts, deletes), anything outside a
+# request (jobs, CLI), every flush, and the rest of a transaction once it
+# has flushed, so a handler reads back its own writes. After a request
+# commits a write, the client's signed session cookie keeps it on the
+# primary for DB_REPLICA_STICKY_SECONDS, so the page it is redirected to
+# doesn't come from a replica that hasn't caught up yet. That needs a
+# SECRET_KEY shared by every worker, so init_app refuses to run without one.
+#----------------------------------------------------------------------------#
+import random
+import time
+
+from flask import current_app, g, has_request_context, request, session as client_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+READ_METHODS = ('GET', 'HEAD')
+STICKY_KEY = '_primary_until'
+
+
+class RoutingSession(Session):
+    """Session reading from the replica bind named in info['replica']."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('replica')
+        if (bind is None and replica is not None and not self._flushing
+                and not self.info.get('wrote') and not isinstance(clause, UpdateBase)):
+            return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_binds(app):
+    return sorted(k for k in app.config.get('SQLALCHEMY_BINDS') or {}
+                  if k.startswith('replica'))
+
+
+def use_primary(session):
+    """Send the rest of session's work to the primary."""
+    session.info.pop('replica', None)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _after_commit(session):
+    if session.info.pop('wrote', False) and has_request_context():
+        use_primary(session)
+        client_session[STICKY_KEY] = (
+            time.time() + current_app.config.get('DB_REPLICA_STICKY_SECONDS', 10))
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('wrote', None)
+
+
+def init_app(app):
+    """Call before db.init_app(app) so the replica engines get created."""
+    urls = app.config.get('DB_REPLICA_URLS') or ()
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    for n, url in enumerate(urls):
+        binds.setdefault('replica%d' % n, url)
+    replicas = replica_binds(app)
+    if not replicas:
+        return
+    if app.config.get('SECRET_KEY_GENERATED'):
+        # Every worker would have its own key and drop the others' cookies,
+        # and with them the stickiness.
+        raise RuntimeError('read replicas need a shared SECRET_KEY')
+
+    @app.before_request
+    def route_reads():
+        if request.method not in READ_METHODS:
+            return
+        if client_session.get(STICKY_KEY, 0) > time.time():
+            return
+        g.replica = random.choice(replicas)
+        app.extensions['sqlalchemy'].session.info['replica'] = g.replica
@@ -0,0 +1,194 @@
+#----------------------------------------------------------------------------#
+# Search over venues and artists.
+#
+# On PostgreSQL the search runs on the pg_trgm GIN indexes created by the
+# migrations (ILIKE can use them), ranked by trigram similarity, with genres
+# matched through the Genre table. Other databases (SQLite in tests/dev) get
+# an in-process inverted index instead. Writes reach it through a 'reindex'
+# background job enqueued once their transaction commits.
+#----------------------------------------------------------------------------#
+import bisect
+import re
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+import jobs
+from models import db, Venue, Artist, Genre
+
+SEARCH_FIELDS = ('name', 'city', 'state')
+
+_word_re = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    return [w.lower() for w in _word_re.findall(text or '')]
+
+
+def _doc_values(obj):
+    return [getattr(obj, f) for f in SEARCH_FIELDS] + [' '.join(obj.genre_names)]
+
+
+class InvertedIndex:
+    """token -> ids index for one model, with prefix lookup on a sorted
+    token list so partially typed words still match."""
+
+    def __init__(self, model):
+        self.model = model
+        self.postings = {}
+        self.tokens = []
+        self.docs = {}
+        self.loaded = False
+        self.lock = threading.RLock()
+
+    def load(self, session=None):
+        with self.lock:
+            if self.loaded:
+                return
+            for obj in (session or db.session).query(self.model):
+                self._add(obj.id, _doc_values(obj))
+            self.loaded = True
+
+    def _add(self, doc_id, values):
+        name_tokens = set(tokenize(values[0]))
+        doc_tokens = set(name_tokens)
+        for value in values[1:]:
+            doc_tokens.update(tokenize(value))
+        self.docs[doc_id] = (doc_tokens, name_tokens)
+        for token in doc_tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                bisect.insort(self.tokens, token)
+            ids.add(doc_id)
+
+    def _remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for token in doc[0]:
+            ids = self.postings[token]
+            ids.discard(doc_id)
+            if not ids:
+                del self.postings[token]
+                del self.tokens[bisect.bisect_left(self.tokens, token)]
+
+    def update(self, obj):
+        with self.lock:
+            if not self.loaded:
+                return
+            self._remove(obj.id)
+            self._add(obj.id, _doc_values(obj))
+
+    def remove(self, doc_id):
+        with self.lock:
+            if self.loaded:
+                self._remove(doc_id)
+
+    def _prefix_ids(self, prefix):
+        ids = set()
+        i = bisect.bisect_left(self.tokens, prefix)
+        while i < len(self.tokens) and self.tokens[i].startswith(prefix):
+            ids |= self.postings[self.tokens[i]]
+            i += 1
+        return ids
+
+    def search(self, term, limit, session=None):
+        words = tokenize(term)
+        if not words:
+            return []
+        self.load(session)
+        with self.lock:
+            ids = None
+            for word in words:
+                ids = self._prefix_ids(word) if ids is None else ids & self._prefix_ids(word)
+                if not ids:
+                    return []
+
+            # Exact word hits rank above prefix hits, and hits in the name
+            # above hits in city/state/genres.
+            def rank(doc_id):
+                doc_tokens, name_tokens = self.docs[doc_id]
+                return (-sum(w in name_tokens for w in words),
+                        -sum(w in doc_tokens for w in words),
+                        -sum(any(t.startswith(w) for t in name_tokens) for w in words),
+                        doc_id)
+            return sorted(ids, key=rank)[:limit]
+
+
+_indexes = {Venue: InvertedIndex(Venue), Artist: InvertedIndex(Artist)}
+
+
+MODELS = {model.__name__: model for model in _indexes}
+
+
+@jobs.job('reindex')
+def reindex(model_name, ids):
+    """Bring the index up to date for the given ids (deleted ones drop out)."""
+    model = MODELS[model_name]
+    index = _indexes[model]
+    if not index.loaded:
+        return
+    # Read and apply under the index lock so two jobs for the same rows
+    # can't apply an older read last.
+    with index.lock:
+        found = model.query.filter(model.id.in_(ids)).all()
+        for obj in found:
+            index.update(obj)
+        for doc_id in set(ids) - {obj.id for obj in found}:
+            index.remove(doc_id)
+
+
+def _changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('reindex', {}).setdefault(
+            type(target).__name__, set()).add(target.id)
+
+
+def _after_commit(session):
+    for model_name, ids in session.info.pop('reindex', {}).items():
+        jobs.enqueue('reindex', model_name, sorted(ids))
+
+
+def _after_rollback(session):
+    session.info.pop('reindex', None)
+
+
+for _model in _indexes:
+    event.listen(_model, 'after_insert', _changed)
+    event.listen(_model, 'after_update', _changed)
+    event.listen(_model, 'after_delete', _changed)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_rollback', _after_rollback)
+
+
+def _search_postgresql(session, model, words, term, limit):
+    # Every word has to match one of the searchable columns; each ILIKE is
+    # served by that column's trigram index.
+    columns = [getattr(model, f) for f in SEARCH_FIELDS]
+    criteria = [db.or_(model.genres.any(Genre.name.ilike('%{}%'.format(w))),
+                       *[c.ilike('%{}%'.format(w)) for c in columns])
+                for w in words]
+    rank = db.func.similarity(model.name, term)
+    return session.query(model).filter(*criteria).order_by(
+        rank.desc(), model.id).limit(limit).all()
+
+
+def search(model, term, limit=50, session=None):
+    term = (term or '').strip()
+    session = session or db.session
+    if not term:
+        # An empty search lists everything, as far as the limit goes.
+        return session.query(model).order_by(model.id).limit(limit).all()
+    words = tokenize(term)
+    if not words:
+        return []
+    if session.get_bind().dialect.name == 'postgresql':
+        return _search_postgresql(session, model, words, term, limit)
+    ids = _indexes[model].search(term, limit, session)
+    if not ids:
+        return []
+    found = {m.id: m for m in session.query(model).filter(model.id.in_(ids)).all()}
+    return [found[i] for i in ids if i in found]
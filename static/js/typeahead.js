@@ -0,0 +1,67 @@
+// Name typeahead for the show form. Each <input data-typeahead="<url>"
+// data-target="<id field>"> gets a datalist of matches from the typeahead
+// API; picking one writes its id into the target field, which is what the
+// form submits. Without JavaScript the id fields stay plain number inputs.
+(function () {
+  var DELAY = 120;
+
+  function label(item) {
+    return item.name + ' (' + [item.city, item.state].filter(Boolean).join(', ') + ')';
+  }
+
+  function wire(input) {
+    var target = document.getElementById(input.getAttribute('data-target'));
+    var list = document.getElementById(input.getAttribute('list'));
+    var url = input.getAttribute('data-typeahead');
+    var ids = {};
+    var timer = null;
+    var seq = 0;
+
+    function pick() {
+      var id = ids[input.value];
+      target.value = id === undefined ? '' : id;
+      input.setCustomValidity(id === undefined && input.value ? 'Pick a name from the list.' : '');
+    }
+
+    function fetchMatches() {
+      var q = input.value.trim();
+      var mine = ++seq;
+      if (!q) {
+        return;
+      }
+      fetch(url + '?q=' + encodeURIComponent(q), {credentials: 'same-origin'})
+        .then(function (r) { return r.json(); })
+        .then(function (body) {
+          if (mine !== seq) {
+            return;  // a newer request is on its way
+          }
+          ids = {};
+          list.innerHTML = '';
+          body.data.forEach(function (item) {
+            var option = document.createElement('option');
+            option.value = label(item);
+            ids[option.value] = item.id;
+            list.appendChild(option);
+          });
+          pick();
+        });
+    }
+
+    input.addEventListener('input', function () {
+      pick();
+      clearTimeout(timer);
+      timer = setTimeout(fetchMatches, DELAY);
+    });
+    input.addEventListener('change', pick);
+
+    target.type = 'hidden';
+    input.style.display = '';
+    input.required = true;
+    if (target.value) {
+      input.placeholder = '#' + target.value;
+      input.required = false;
+    }
+  }
+
+  document.querySelectorAll('input[data-typeahead]').forEach(wire);
+})();
@@ -0,0 +1,81 @@
+import os
+import random
+import sys
+
+# config.py reads the environment on import.
+os.environ['FYYUR_ENV'] = 'test'
+os.environ.setdefault('LOG_FILE', os.devnull)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import event
+
+import search
+import typeahead
+from app import create_app
+from benchmark import seed
+from models import db
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """make_app(venues, artists, shows, **config) -> app on a fresh seeded
+    SQLite file, inside an app context."""
+    contexts = []
+
+    def make(venues=20, artists=40, shows=200, **config):
+        # The search and typeahead indexes are per process; start them
+        # over for the new database.
+        for model in search.MODELS.values():
+            search._indexes[model] = search.InvertedIndex(model)
+            typeahead.INDEXES[model] = typeahead.PrefixIndex(model)
+        path = tmp_path / ('fyyur-%d.db' % len(contexts))
+        app = create_app(dict({'SQLALCHEMY_DATABASE_URI': 'sqlite:///%s' % path,
+                               'CACHE_TYPE': 'null', 'WARMUP': False}, **config))
+        ctx = app.app_context()
+        ctx.push()
+        contexts.append(ctx)
+        # Only the primary: replica binds registered by an earlier app stay
+        # in db.metadatas.
+        db.create_all(bind_key=None)
+        seed(venues, artists, shows, random.Random(1))
+        db.session.commit()
+        return app
+
+    yield make
+    for ctx in reversed(contexts):
+        db.session.remove()
+        db.engine.dispose()
+        ctx.pop()
+
+
+class StatementLog:
+
+    def __init__(self, engine):
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self)
+
+    def __call__(self, conn, cursor, statement, parameters, *args):
+        self.statements.append((statement, parameters))
+
+
+@pytest.fixture
+def capture_statements():
+    """capture_statements(app, url) -> (statement, parameters) for every
+    statement run while serving GET url."""
+    def capture(app, url):
+        log = StatementLog(db.engine)
+        try:
+            response = app.test_client().get(url)
+            response.get_data()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', log)
+        assert response.status_code == 200, url
+        return log.statements
+    return capture
+
+
+@pytest.fixture
+def count_queries(capture_statements):
+    """count_queries(app, url) -> number of statements run serving GET url."""
+    return lambda app, url: len(capture_statements(app, url))
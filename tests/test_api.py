@@ -0,0 +1,47 @@
+import pytest
+
+from models import db
+
+LISTS = ['/api/v1/venues', '/api/v1/artists', '/api/v1/shows',
+         '/api/v1/venues/available?start=2030-01-01T20:00&end=2030-01-01T23:00']
+
+
+def test_keyset_paging(make_app):
+    app = make_app(25, 5, 0)
+    client = app.test_client()
+    ids, after = [], 0
+    while after is not None:
+        page = client.get('/api/v1/venues?limit=10&after=%d' % after).get_json()
+        assert len(page['data']) <= 10
+        ids += [v['id'] for v in page['data']]
+        after = page['next_id']
+    assert ids == list(range(1, 26))
+
+
+def test_limit_capped(make_app):
+    app = make_app(25, 5, 0, API_MAX_PAGE_SIZE=7)
+    page = app.test_client().get('/api/v1/venues?limit=1000').get_json()
+    assert [v['id'] for v in page['data']] == list(range(1, 8))
+    assert page['next_id'] == 7
+
+
+def test_fields(make_app):
+    app = make_app(5, 5, 10)
+    client = app.test_client()
+    page = client.get('/api/v1/artists?fields=name,id').get_json()
+    assert all(set(a) == {'id', 'name'} for a in page['data'])
+    show = client.get('/api/v1/shows?fields=id,venue_name').get_json()['data'][0]
+    assert set(show) == {'id', 'venue_name'}
+    response = client.get('/api/v1/venues?fields=id,password')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'unknown fields: password'}
+
+
+@pytest.mark.parametrize('url', LISTS)
+def test_lists_release_connection(make_app, url):
+    app = make_app(5, 5, 10)
+    db.session.close()
+    response = app.test_client().get(url)
+    assert response.status_code == 200
+    assert response.get_json()['data']
+    assert db.engine.pool.checkedout() == 0
@@ -0,0 +1,62 @@
+import gzip
+
+import pytest
+from flask import Flask, url_for
+
+import assets
+
+CSS = b'body { background: url("../img/bg.png"); }\n' + b'.x { color: red; }\n' * 200
+
+
+@pytest.fixture
+def app(tmp_path):
+    static = tmp_path / 'static'
+    (static / 'css').mkdir(parents=True)
+    (static / 'img').mkdir()
+    (static / 'css' / 'main.css').write_bytes(CSS)
+    (static / 'img' / 'bg.png').write_bytes(b'\x89PNG not really')
+    app = Flask(__name__, static_folder=str(static))
+    app.manifest = assets.build(app.static_folder)
+    # Added after the build, so only served from static/.
+    (static / 'late.txt').write_text('late\n')
+    assets.init_app(app)
+    return app
+
+
+def hashed_url(app, filename):
+    with app.test_request_context():
+        return url_for('static', filename=filename)
+
+
+def test_url_for_points_at_hashed_file(app):
+    assert hashed_url(app, 'css/main.css') == '/static/' + app.manifest['css/main.css']['file']
+    assert hashed_url(app, 'late.txt') == '/static/late.txt'
+
+
+def test_hashed_file_is_immutable(app):
+    client = app.test_client()
+    url = hashed_url(app, 'css/main.css')
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.mimetype == 'text/css'
+    # The url() points at the hashed image, relative to the hashed CSS.
+    image = app.manifest['img/bg.png']['file'][len('dist/'):]
+    assert gzip.decompress(response.data) == CSS.replace(
+        b'../img/bg.png', b'../' + image.encode())
+
+    response = client.get(url, headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+
+def test_plain_path_stays_no_cache(app):
+    client = app.test_client()
+    for path in ('/static/css/main.css', '/static/late.txt'):
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'no-cache'
+        assert 'Content-Encoding' not in response.headers
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip('aiosqlite')
+pytest.importorskip('asgiref')
+
+from app import create_app
+
+URLS = ['/venues', '/venues/1', '/artists', '/artists.json', '/artists/1',
+        '/shows', '/shows?when=all']
+
+
+@pytest.fixture
+def apps(make_app):
+    """The async build and a sync one on the same seeded database."""
+    async_app = make_app(5, 10, 40, ASYNC_READS=True)
+    sync_app = create_app({'SQLALCHEMY_DATABASE_URI': async_app.config['SQLALCHEMY_DATABASE_URI'],
+                           'CACHE_TYPE': 'null', 'WARMUP': False})
+    assert async_app.view_functions['main.shows'] is not sync_app.view_functions['main.shows']
+    yield sync_app, async_app
+    async_app.extensions['aio'].shutdown()
+
+
+@pytest.mark.parametrize('url', URLS)
+def test_async_views_match_sync(apps, url):
+    sync_app, async_app = apps
+    expected = sync_app.test_client().get(url)
+    response = async_app.test_client().get(url)
+    assert response.status_code == expected.status_code == 200
+    assert response.get_data(as_text=True) == expected.get_data(as_text=True)
+
+
+def test_async_search_matches_sync(apps):
+    sync_app, async_app = apps
+    data = {'search_term': 'artist'}
+    expected = sync_app.test_client().post('/artists/search', data=data)
+    response = async_app.test_client().post('/artists/search', data=data)
+    assert response.get_data(as_text=True) == expected.get_data(as_text=True)
@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+
+import availability
+from models import db, Venue, Artist, Show
+
+DAY = datetime.datetime(2040, 1, 1)
+
+
+def at(hour):
+    return DAY + datetime.timedelta(hours=hour)
+
+
+@pytest.fixture
+def booked(make_app):
+    # Venue 1 and artist 1: a show from 20:00 to 22:00. Venue 2: a six-hour
+    # show from 10:00. Venue 3 has nothing.
+    app = make_app(3, 2, 0)
+    Venue.query.update({'seeking_talent': True, 'city': 'City', 'state': 'NY'})
+    db.session.execute(Show.__table__.insert(), [
+        {'venue_id': 1, 'artist_id': 1, 'start_time': at(20), 'end_time': at(22), 'duration': 120},
+        {'venue_id': 2, 'artist_id': 2, 'start_time': at(10), 'end_time': at(16), 'duration': 360}])
+    db.session.commit()
+    return app
+
+
+def free_venues(start, end, **filters):
+    return [v.id for v in availability.available(Venue, at(start), at(end), **filters)
+            .order_by(Venue.id)]
+
+
+@pytest.mark.parametrize('start, end, free', [
+    (18, 20, [1, 2, 3]),   # ends as the show starts
+    (22, 23, [1, 2, 3]),   # starts as it ends
+    (19, 21, [2, 3]),
+    (21, 23, [2, 3]),
+    (20.5, 21.5, [2, 3]),  # inside it
+    (19, 23, [2, 3]),      # around it
+    # Overlaps the end of a show that started well before the window.
+    (15, 17, [1, 3]),
+])
+def test_overlap_window(booked, start, end, free):
+    assert free_venues(start, end) == free
+    for venue_id in (1, 2, 3):
+        assert availability.is_free(Venue, venue_id, at(start), at(end)) == (venue_id in free)
+
+
+def test_filters(booked):
+    venue = db.session.get(Venue, 3)
+    venue.seeking_talent = False
+    db.session.commit()
+    assert free_venues(8, 9) == [1, 2]
+    assert free_venues(8, 9, seeking=False) == [1, 2, 3]
+    assert free_venues(8, 9, city='Elsewhere') == []
+    genre = db.session.get(Venue, 2).genre_names[0]
+    assert 2 in free_venues(8, 9, genres=[genre])
+
+
+def test_artist_side_and_api(booked):
+    assert not availability.is_free(Artist, 1, at(21), at(23))
+    assert availability.is_free(Artist, 2, at(21), at(23))
+    client = booked.test_client()
+    url = '/api/v1/venues/available?start=%s&end=%s&fields=id' % (
+        at(21).isoformat(), at(23).isoformat())
+    assert [v['id'] for v in client.get(url).get_json()['data']] == [2, 3]
+    # The artist is booked then.
+    response = client.get(url + '&artist_id=1')
+    assert response.status_code == 409
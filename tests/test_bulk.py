@@ -0,0 +1,95 @@
+import json
+
+import counters
+from bulk import import_data, export_data
+from models import db, Venue, Artist, Show
+
+VENUE = {'name': 'Imported Venue', 'city': 'City', 'state': 'NY',
+         'address': '1 Main St', 'phone': '123-123-1234',
+         'image_link': 'https://example.com/v.jpg',
+         'facebook_link': 'https://facebook.com/v',
+         'website': 'https://example.com', 'seeking_talent': 'y',
+         'seeking_description': ''}
+
+
+def write_jsonl(path, rows):
+    path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+    return str(path)
+
+
+def shows(n, first_id=1000):
+    return [{'id': first_id + i, 'venue_id': 1, 'artist_id': 1,
+             'start_time': '2040-01-%02dT20:00' % (i + 1), 'duration': 60}
+            for i in range(n)]
+
+
+def test_csv_import_skips_invalid_rows(make_app, tmp_path):
+    app = make_app(2, 2, 0)
+    path = tmp_path / 'venues.csv'
+    path.write_text(
+        'name,city,state,address,phone,genres,image_link,facebook_link,website\n'
+        'CSV One,City,NY,1 Main St,123-123-1234,"Jazz,Folk",https://e.com/1.jpg,https://facebook.com/1,https://e.com\n'
+        'CSV Bad,City,NY,1 Main St,not a phone,Jazz,https://e.com/2.jpg,https://facebook.com/2,https://e.com\n'
+        'CSV Two,City,NY,1 Main St,123-123-1234,Rock n Roll,https://e.com/3.jpg,https://facebook.com/3,https://e.com\n')
+    result = app.test_cli_runner().invoke(import_data, ['venues', str(path)])
+    assert result.exit_code == 0, result.output
+    assert 'row 2: phone' in result.output
+    assert 'Imported 2 venues' in result.output
+    one = Venue.query.filter_by(name='CSV One').one()
+    assert sorted(one.genre_names) == ['Folk', 'Jazz']
+    assert Venue.query.filter_by(name='CSV Bad').count() == 0
+    # New rows got ids past the seeded ones.
+    assert one.id == 3
+
+
+def test_strict_stops_but_counts_committed_batches(make_app, tmp_path):
+    app = make_app(2, 2, 0)
+    rows = shows(4)
+    rows.insert(3, {'venue_id': 99, 'artist_id': 1, 'start_time': '2040-02-01T20:00'})
+    path = write_jsonl(tmp_path / 'shows.jsonl', rows)
+    result = app.test_cli_runner().invoke(
+        import_data, ['shows', path, '--strict', '--batch-size', '2'])
+    assert result.exit_code == 1
+    assert 'row 4: unknown venue_id 99' in result.output
+    # The first batch was committed, the second (one row so far) was not.
+    assert Show.query.count() == 2
+    assert counters.mismatches() == []
+    assert db.session.get(Venue, 1).upcoming_shows_count == 2
+
+
+def test_failed_batch_keeps_committed_counts(make_app, tmp_path):
+    app = make_app(2, 2, 0)
+    # The second batch repeats an id from the first.
+    path = write_jsonl(tmp_path / 'shows.jsonl', shows(2) + shows(2, first_id=1001))
+    result = app.test_cli_runner().invoke(
+        import_data, ['shows', path, '--batch-size', '2'])
+    assert result.exit_code == 1
+    assert Show.query.count() == 2
+    assert counters.mismatches() == []
+
+
+def test_non_strict_imports_around_invalid_rows(make_app, tmp_path):
+    app = make_app(2, 2, 0)
+    rows = shows(3)
+    rows.insert(1, {'venue_id': 1, 'artist_id': 1, 'start_time': 'tomorrow'})
+    path = write_jsonl(tmp_path / 'shows.jsonl', rows)
+    result = app.test_cli_runner().invoke(import_data, ['shows', path, '--batch-size', '2'])
+    assert result.exit_code == 0, result.output
+    assert "invalid start_time 'tomorrow'" in result.output
+    assert Show.query.count() == 3
+    assert counters.mismatches() == []
+
+
+def test_export_import_round_trip(make_app, tmp_path):
+    source = make_app(2, 6, 0)
+    exported = tmp_path / 'artists.jsonl'
+    result = source.test_cli_runner().invoke(export_data, ['artists', str(exported)])
+    assert 'Exported 6 artists' in result.output
+
+    target = make_app(1, 1, 0)
+    db.session.get(Artist, 1).delete()
+    result = target.test_cli_runner().invoke(import_data, ['artists', str(exported)])
+    assert 'Imported 6 artists' in result.output, result.output
+    again = tmp_path / 'again.jsonl'
+    target.test_cli_runner().invoke(export_data, ['artists', str(again)])
+    assert again.read_text() == exported.read_text()
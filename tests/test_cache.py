@@ -0,0 +1,76 @@
+import datetime
+
+import pytest
+
+from cache import cache
+from models import db, Venue, Artist
+
+FORM = {'city': 'City', 'state': 'NY', 'address': '1 Main St',
+        'phone': '123-123-1234', 'genres': ['Jazz'],
+        'facebook_link': 'https://facebook.com/x',
+        'image_link': 'https://example.com/x.jpg',
+        'website': 'https://example.com', 'seeking_description': ''}
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(5, 5, 20, CACHE_TYPE='lru', SHOWS_STREAMING=False)
+
+
+def warm(client, *urls):
+    for url in urls:
+        client.get(url)
+    hits = cache.hits
+    for url in urls:
+        client.get(url)
+    assert cache.hits == hits + len(urls)
+
+
+def get_miss(client, url):
+    misses = cache.misses
+    response = client.get(url)
+    assert cache.misses == misses + 1, url
+    return response.get_data(as_text=True)
+
+
+def test_new_show_drops_show_pages(app):
+    # Writes go through their own client: the flash message they leave
+    # would keep the next page out of the cache.
+    reader = app.test_client()
+    artist = db.session.get(Artist, 2)
+    artist.name = 'Cache Artist'
+    db.session.commit()
+    warm(reader, '/shows', '/artists/2', '/venues/3', '/artists/1')
+    listed = reader.get('/shows').get_data(as_text=True).count('Cache Artist')
+    artist_upcoming = db.session.get(Artist, 2).upcoming_shows_count
+    venue_upcoming = db.session.get(Venue, 3).upcoming_shows_count
+    start = (datetime.datetime.now() + datetime.timedelta(days=400)).strftime('%Y-%m-%d %H:%M')
+    app.test_client().post('/shows/create', data={
+        'artist_id': 2, 'venue_id': 3, 'start_time': start, 'duration': 60})
+    assert get_miss(reader, '/shows').count('Cache Artist') == listed + 1
+    assert '%d Upcoming' % (artist_upcoming + 1) in get_miss(reader, '/artists/2')
+    assert '%d Upcoming' % (venue_upcoming + 1) in get_miss(reader, '/venues/3')
+    # Pages the show doesn't appear on stay cached.
+    hits = cache.hits
+    reader.get('/artists/1')
+    assert cache.hits == hits + 1
+
+
+def test_edit_drops_entity_page(app):
+    reader = app.test_client()
+    warm(reader, '/venues/1', '/venues')
+    response = app.test_client().post('/venues/1/edit', data=dict(FORM, name='Renamed Venue'))
+    assert response.status_code == 302
+    assert 'Renamed Venue' in get_miss(reader, '/venues/1')
+    assert 'Renamed Venue' in get_miss(reader, '/venues')
+
+
+def test_delete_drops_lists(app):
+    reader = app.test_client()
+    name = db.session.get(Venue, 2).name
+    warm(reader, '/venues', '/shows?when=all')
+    assert name in reader.get('/venues').get_data(as_text=True)
+    assert name in reader.get('/shows?when=all').get_data(as_text=True)
+    assert app.test_client().delete('/venues/2').status_code == 200
+    assert name not in get_miss(reader, '/venues')
+    assert name not in get_miss(reader, '/shows?when=all')
@@ -0,0 +1,44 @@
+
+FORM = {'city': 'City', 'state': 'NY', 'address': '1 Main St',
+        'phone': '123-123-1234', 'genres': ['Jazz'],
+        'facebook_link': 'https://facebook.com/x',
+        'image_link': 'https://example.com/x.jpg',
+        'website': 'https://example.com', 'seeking_description': ''}
+
+def test_304_until_edited(make_app):
+    app = make_app(3, 3, 10)
+    client = app.test_client()
+    first = client.get('/venues/1')
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == app.config['ENTITY_CACHE_CONTROL']
+
+    again = client.get('/venues/1', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+
+    app.test_client().post('/venues/1/edit', data=dict(FORM, name='New Name'))
+    edited = client.get('/venues/1', headers={'If-None-Match': etag})
+    assert edited.status_code == 200
+    assert edited.headers['ETag'] != etag
+    assert b'New Name' in edited.data
+
+def test_new_show_changes_etag(make_app):
+    app = make_app(3, 3, 0)
+    client = app.test_client()
+    etag = client.get('/artists/2').headers['ETag']
+    app.test_client().post('/shows/create', data={
+        'artist_id': 2, 'venue_id': 1, 'start_time': '2040-01-01 20:00', 'duration': 60})
+    assert client.get('/artists/2', headers={'If-None-Match': etag}).status_code == 200
+
+def test_no_304_with_flashes(make_app):
+    app = make_app(3, 3, 0)
+    client = app.test_client()
+    etag = client.get('/venues/1').headers['ETag']
+    # A failed edit flashes its errors and redirects back to the page.
+    response = client.post('/venues/1/edit', data=dict(FORM, name=''))
+    assert response.status_code == 302
+    page = client.get('/venues/1', headers={'If-None-Match': etag})
+    assert page.status_code == 200
+    assert b'following error messages' in page.data
+    assert page.headers['Cache-Control'] == 'private, no-store'
@@ -0,0 +1,25 @@
+import datetime
+
+from models import db, Show
+
+BASE = datetime.datetime(2030, 1, 1)
+
+
+def at(hour):
+    return BASE + datetime.timedelta(hours=hour)
+
+
+def test_conflicts_with_overlapping_bookings(make_app):
+    # An import can leave overlapping bookings on SQLite: a long show and a
+    # short one inside it. A new booking after the short one still clashes
+    # with the long one.
+    make_app(2, 2, 0)
+    db.session.execute(Show.__table__.insert(), [
+        {'venue_id': 1, 'artist_id': 1, 'start_time': at(10), 'duration': 6 * 60},
+        {'venue_id': 1, 'artist_id': 2, 'start_time': at(11), 'duration': 60}])
+    db.session.commit()
+    clashes = Show.conflicts(1, 2, at(13), 60)
+    assert [(s.venue_id, s.artist_id, s.start_time) for s in clashes] == [(1, 1, at(10))]
+    assert Show.conflicts(1, 2, at(16), 60) == []
+    # The artist side is checked the same way.
+    assert [s.start_time for s in Show.conflicts(2, 1, at(15), 120)] == [at(10)]
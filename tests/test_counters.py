@@ -0,0 +1,63 @@
+import datetime
+
+import counters
+from models import db, Venue, Artist, Show, ShowCounterState
+
+
+def hours(n):
+    return datetime.datetime.now() + datetime.timedelta(hours=n)
+
+
+def counts(model, entity_id):
+    obj = db.session.get(model, entity_id)
+    db.session.refresh(obj)
+    return obj.upcoming_shows_count, obj.past_shows_count
+
+
+def test_writes_keep_counters(make_app):
+    make_app(3, 3, 30)
+    assert counters.mismatches() == []
+    venue_before = counts(Venue, 1)
+
+    show = Show(venue_id=1, artist_id=1, start_time=hours(5), duration=60)
+    show.add()
+    assert counts(Venue, 1) == (venue_before[0] + 1, venue_before[1])
+    assert counters.mismatches() == []
+
+    # Into the past, and over to another venue and artist.
+    show.start_time = hours(-5)
+    show.venue_id, show.artist_id = 2, 2
+    db.session.commit()
+    assert counts(Venue, 1) == venue_before
+    assert counters.mismatches() == []
+
+    show.delete()
+    assert counters.mismatches() == []
+
+    # Deleting a venue deletes its shows, and their artists' counts.
+    db.session.get(Venue, 3).delete()
+    assert counters.mismatches() == []
+
+
+def test_roll_moves_started_shows(make_app):
+    make_app(2, 2, 0)
+    db.session.execute(ShowCounterState.__table__.update().values(rolled_at=hours(0)))
+    db.session.commit()
+    Show(venue_id=1, artist_id=1, start_time=hours(1), duration=60).add()
+    Show(venue_id=1, artist_id=2, start_time=hours(3), duration=60).add()
+    assert counts(Venue, 1) == (2, 0)
+
+    assert counters.roll(now=hours(2)) == 1
+    assert counts(Venue, 1) == (1, 1)
+    assert counts(Artist, 1) == (0, 1)
+    assert counters.mismatches() == []
+    # Rolling to an earlier time is a no-op.
+    assert counters.roll(now=hours(1)) == 0
+
+
+def test_roll_scheduled_from_requests(make_app):
+    app = make_app(2, 2, 0, SHOW_COUNTERS_ROLL_INTERVAL=0.001)
+    mark = counters.watermark(db.session.connection())
+    db.session.commit()
+    app.test_client().get('/')
+    assert counters.watermark(db.session.connection()) > mark
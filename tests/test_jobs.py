@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from jobs import JobQueue, job
+
+calls = {}
+
+
+def record(name):
+    calls.setdefault(name, []).append((time.monotonic(), threading.current_thread()))
+
+
+@job('test-flaky')
+def flaky(fail_times):
+    record('flaky')
+    if len(calls['flaky']) <= fail_times:
+        raise RuntimeError('not yet')
+
+
+@job('test-block')
+def block(started, release):
+    record('block')
+    started.set()
+    release.wait(5)
+
+
+@job('test-record')
+def record_job(name, seconds=0):
+    time.sleep(seconds)
+    record(name)
+
+
+@pytest.fixture
+def queue():
+    calls.clear()
+    app = Flask(__name__)
+    app.config.update(JOBS_MODE='thread', JOBS_WORKERS=1, JOBS_QUEUE_SIZE=1,
+                      JOBS_ENQUEUE_TIMEOUT=0.05, JOBS_RETRY_DELAY=0.1,
+                      JOBS_MAX_RETRIES=3, JOBS_SHUTDOWN_TIMEOUT=5)
+    jobs = JobQueue()
+    jobs.init_app(app)
+    yield jobs
+    jobs.shutdown(timeout=1)
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_retry_with_backoff(queue):
+    queue.enqueue('test-flaky', 2)
+    wait_for(lambda: queue.metrics.completed == 1)
+    times = [t for t, _ in calls['flaky']]
+    assert len(times) == 3
+    # 0.1s, then 0.2s
+    assert times[1] - times[0] >= 0.1
+    assert times[2] - times[1] >= 0.2
+    assert queue.metrics.retried == 2
+    assert queue.metrics.failed == 0
+
+
+def test_gives_up_after_max_retries(queue):
+    queue.enqueue('test-flaky', 10)
+    wait_for(lambda: queue.metrics.failed == 1)
+    assert len(calls['flaky']) == 4
+
+
+def test_full_queue_runs_inline(queue):
+    started, release = threading.Event(), threading.Event()
+    queue.enqueue('test-block', started, release)
+    started.wait(5)
+    queue.enqueue('test-record', 'queued')
+    queue.enqueue('test-record', 'overflow')
+    # The queue was full, so the caller ran the job itself.
+    assert calls['overflow'][0][1] is threading.current_thread()
+    assert 'queued' not in calls
+    assert queue.metrics.ran_inline == 1
+    release.set()
+    wait_for(lambda: 'queued' in calls)
+
+
+def test_retry_into_full_queue_runs_inline(queue):
+    started, release = threading.Event(), threading.Event()
+    queue.retry_delay = 0.3
+    queue.enqueue('test-flaky', 1)
+    wait_for(lambda: 'flaky' in calls)
+    queue.enqueue('test-block', started, release)
+    started.wait(5)
+    queue.enqueue('test-record', 'queued')
+    # The retry finds the queue full and runs on its timer thread rather
+    # than waiting for a slot.
+    wait_for(lambda: len(calls['flaky']) == 2, timeout=2)
+    assert calls['flaky'][1][1].name != 'job-worker-0'
+    release.set()
+
+
+def test_shutdown_drains_queue(queue):
+    queue.queue_size = 10
+    for n in range(5):
+        queue.enqueue('test-record', 'drained', 0.02)
+    queue.shutdown()
+    assert len(calls['drained']) == 5
+    assert queue.metrics.completed == 5
+    # Jobs enqueued after shutdown run in the caller.
+    queue.enqueue('test-record', 'late')
+    assert calls['late'][0][1] is threading.current_thread()
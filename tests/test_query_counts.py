@@ -0,0 +1,16 @@
+import pytest
+
+# Statements per request on the read routes, which must not grow with the
+# number of rows. /shows runs a few per SHOWS_BATCH_SIZE rows it streams,
+# so the batch is kept above the number of shows here.
+CEILINGS = {'/shows': 9, '/venues/1': 7, '/artists/1': 7, '/venues': 2}
+
+
+@pytest.mark.parametrize('url', sorted(CEILINGS))
+def test_query_count_constant(make_app, count_queries, url):
+    counts = []
+    for scale in (1, 4):
+        app = make_app(20 * scale, 40 * scale, 200 * scale, SHOWS_BATCH_SIZE=10000)
+        counts.append(count_queries(app, url))
+    assert counts[0] == counts[1], counts
+    assert counts[0] <= CEILINGS[url]
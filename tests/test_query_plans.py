@@ -0,0 +1,22 @@
+import re
+
+import pytest
+
+from models import db
+
+# A full scan of one of these tables means a hot query lost its index.
+FULL_SCAN = re.compile(r'^SCAN (Show|Venue|Artist)(_\d+)?\b')
+
+
+@pytest.mark.parametrize('url', ['/shows', '/venues/1', '/artists/1'])
+def test_no_full_scans(make_app, capture_statements, url):
+    app = make_app(SHOWS_BATCH_SIZE=10000)
+    db.session.execute(db.text('ANALYZE'))
+    statements = capture_statements(app, url)
+    assert statements
+    cursor = db.engine.raw_connection().cursor()
+    for statement, parameters in statements:
+        plan = [row[3] for row in
+                cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)]
+        scans = [step for step in plan if FULL_SCAN.match(step)]
+        assert not scans, (statement, plan)
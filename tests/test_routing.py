@@ -0,0 +1,46 @@
+import pytest
+
+from app import create_app
+from models import db, Venue
+
+EDIT = {'name': 'Fresh Name', 'city': 'City', 'state': 'NY', 'address': '1 Main St',
+        'phone': '123-123-1234', 'genres': ['Jazz'],
+        'facebook_link': 'https://facebook.com/venue',
+        'image_link': 'https://example.com/venue.jpg',
+        'website': 'https://example.com', 'seeking_description': ''}
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    # Two SQLite files stand in for the primary and a replica that lags:
+    # the replica still has venue 1 under its old name.
+    app = make_app(5, 5, 10, SECRET_KEY='test',
+                   DB_REPLICA_URLS=['sqlite:///%s' % (tmp_path / 'replica.db')])
+    replica = db.engines['replica0']
+    db.metadata.create_all(replica)
+    with replica.begin() as connection:
+        connection.execute(Venue.__table__.insert().values(
+            id=1, name='Stale Name', city='City', state='NY'))
+    return app
+
+
+def test_reads_go_to_replica(app):
+    assert b'Stale Name' in app.test_client().get('/venues/1').data
+
+
+def test_read_your_writes_after_post(app):
+    client = app.test_client()
+    response = client.post('/venues/1/edit', data=EDIT)
+    assert response.status_code == 302
+    page = client.get(response.headers['Location'])
+    # The flash message names the venue too, so look for the stale name.
+    assert b'Stale Name' not in page.data
+    # Other clients keep reading the replica.
+    assert b'Stale Name' in app.test_client().get('/venues/1').data
+
+
+def test_replicas_need_a_shared_secret_key(tmp_path):
+    with pytest.raises(RuntimeError):
+        create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///%s' % (tmp_path / 'p.db'),
+                    'DB_REPLICA_URLS': ['sqlite:///%s' % (tmp_path / 'r.db')],
+                    'WARMUP': False})
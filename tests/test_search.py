@@ -0,0 +1,69 @@
+import search
+from models import db, Venue, Artist
+
+FORM = {'city': 'Springfield', 'state': 'IL', 'address': '1 Main St',
+        'phone': '123-123-1234', 'genres': ['Jazz'],
+        'facebook_link': 'https://facebook.com/x',
+        'image_link': 'https://example.com/x.jpg',
+        'website': 'https://example.com', 'seeking_description': ''}
+
+
+def names(model, term, limit=50):
+    return [obj.name for obj in search.search(model, term, limit)]
+
+
+def rename(model, entity_id, name, city='City 0'):
+    obj = db.session.get(model, entity_id)
+    obj.name, obj.city = name, city
+    db.session.commit()
+
+
+def test_partial_words(make_app):
+    make_app(5, 5, 0)
+    rename(Venue, 1, 'The Musical Hop')
+    rename(Venue, 2, 'Park Square Live Music & Coffee')
+    assert names(Venue, 'mus') == ['The Musical Hop', 'Park Square Live Music & Coffee']
+    # Every word has to match, each as a prefix.
+    assert names(Venue, 'mus hop') == ['The Musical Hop']
+    assert names(Venue, 'mus xyz') == []
+
+
+def test_ranking(make_app):
+    make_app(5, 5, 0)
+    rename(Artist, 1, 'Guns Band', city='Blues City')
+    rename(Artist, 2, 'Blue Bandana')
+    rename(Artist, 3, 'The Blues Brothers')
+    # An exact word in the name first, then a prefix in the name, then a
+    # match in the city.
+    assert names(Artist, 'blues') == ['The Blues Brothers', 'Guns Band']
+    assert names(Artist, 'blue') == ['Blue Bandana', 'The Blues Brothers', 'Guns Band']
+
+
+def test_empty_term_lists_all(make_app):
+    make_app(5, 5, 0)
+    assert len(names(Venue, '')) == 5
+    assert len(names(Venue, '   ', limit=3)) == 3
+
+
+def test_index_follows_writes(make_app):
+    app = make_app(3, 3, 0)
+    assert names(Venue, 'zebra') == []
+    client = app.test_client()
+    client.post('/venues/create', data=dict(FORM, name='Zebra Lounge'))
+    assert names(Venue, 'zebra') == ['Zebra Lounge']
+    venue_id = Venue.query.filter_by(name='Zebra Lounge').one().id
+
+    client.post('/venues/%d/edit' % venue_id, data=dict(FORM, name='Quokka Lounge'))
+    assert names(Venue, 'zebra') == []
+    assert names(Venue, 'quok') == ['Quokka Lounge']
+
+    client.delete('/venues/%d' % venue_id)
+    assert names(Venue, 'quokka') == []
+
+
+def test_search_page(make_app):
+    app = make_app(3, 3, 0)
+    rename(Artist, 2, 'Matt Quevedo')
+    page = app.test_client().post('/artists/search', data={'search_term': 'quev'})
+    assert b'Matt Quevedo' in page.data
+    assert b': 1</h3>' in page.data
@@ -0,0 +1,17 @@
+import pytest
+
+STATS = ['/cache/stats', '/db/pool/stats', '/jobs/stats']
+
+
+@pytest.mark.parametrize('url', STATS)
+def test_stats_hidden_by_default(make_app, url):
+    app = make_app(1, 1, 0)
+    assert app.test_client().get(url).status_code == 404
+
+
+@pytest.mark.parametrize('url', STATS)
+def test_stats_exposed(make_app, url):
+    app = make_app(1, 1, 0, EXPOSE_STATS=True)
+    response = app.test_client().get(url)
+    assert response.status_code == 200
+    assert response.is_json
@@ -0,0 +1,11 @@
+from models import db
+
+
+def test_streamed_shows_release_connection(make_app):
+    app = make_app(5, 5, 50, SHOWS_STREAMING=True, SHOWS_BATCH_SIZE=10)
+    db.session.close()
+    response = app.test_client().get('/shows?when=all')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.get_data(as_text=True).count('tile-show') == 50
+    assert db.engine.pool.checkedout() == 0
@@ -0,0 +1,45 @@
+import typeahead
+from models import Artist
+
+FORM = {'city': 'Austin', 'state': 'TX', 'address': '1 Main St',
+        'phone': '123-123-1234', 'genres': ['Jazz'],
+        'facebook_link': 'https://facebook.com/x',
+        'image_link': 'https://example.com/x.jpg',
+        'website': 'https://example.com', 'seeking_description': ''}
+
+
+def matches(client, prefix, limit=10):
+    url = '/api/v1/artists/typeahead?q=%s&limit=%d' % (prefix, limit)
+    return [(m['id'], m['name']) for m in client.get(url).get_json()['data']]
+
+
+def test_prefix_of_any_word(make_app):
+    app = make_app(2, 5, 0)
+    client = app.test_client()
+    client.post('/artists/create', data=dict(FORM, name='The Wild Sax Band'))
+    artist_id = Artist.query.filter_by(name='The Wild Sax Band').one().id
+    for prefix in ('the w', 'wild', 'SAX b', 'band'):
+        assert (artist_id, 'The Wild Sax Band') in matches(client, prefix)
+    assert matches(client, 'sax z') == []
+    assert matches(client, '  ') == []
+
+
+def test_index_follows_writes(make_app):
+    app = make_app(2, 5, 0)
+    client = app.test_client()
+    # Load the index before the writes, so they have to reach it.
+    assert matches(client, 'quokka') == []
+    client.post('/artists/create', data=dict(FORM, name='Quokka Quartet'))
+    artist_id = Artist.query.filter_by(name='Quokka Quartet').one().id
+    assert matches(client, 'quok') == [(artist_id, 'Quokka Quartet')]
+
+    client.post('/artists/%d/edit' % artist_id, data=dict(FORM, name='Numbat Quartet'))
+    assert matches(client, 'quok') == []
+    assert matches(client, 'numb') == [(artist_id, 'Numbat Quartet')]
+
+
+def test_limit(make_app):
+    app = make_app(2, 30, 0, TYPEAHEAD_MAX_LIMIT=5)
+    # Seeded names are "Artist <n> <genre>".
+    assert len(typeahead.lookup(Artist, 'artist', 20)) == 20
+    assert len(matches(app.test_client(), 'artist', limit=50)) == 5
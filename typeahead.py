@@ -0,0 +1,140 @@
+#----------------------------------------------------------------------------#
+# Typeahead over venue and artist names.
+#
+# Each model gets a sorted array of (key, id) pairs, one per word of the
+# name, where key is the lowercased name from that word on: "The Blue Bar"
+# is found by "the", "blue b" and "bar". A lookup is a bisect to the first
+# key with the prefix and a short walk, so top-k answers take microseconds.
+#
+# Writes reach the index from mapper hooks once their transaction commits.
+# Other processes (gunicorn workers) pick them up by reloading in the
+# background when their copy is older than TYPEAHEAD_MAX_AGE seconds; the
+# old copy keeps answering meanwhile.
+#----------------------------------------------------------------------------#
+import bisect
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+import jobs
+from models import db, Venue, Artist
+
+
+def keys(name):
+    words = (name or '').lower().split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+
+    def __init__(self, model):
+        self.model = model
+        self.entries = []
+        self.labels = {}
+        self.loaded_at = None
+        self.reloading = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        rows = db.session.query(self.model.id, self.model.name,
+                                self.model.city, self.model.state).all()
+        entries = []
+        labels = {}
+        for entity_id, name, city, state in rows:
+            labels[entity_id] = (name, city, state)
+            entries.extend((key, entity_id) for key in keys(name))
+        entries.sort()
+        with self.lock:
+            self.entries = entries
+            self.labels = labels
+            self.loaded_at = time.monotonic()
+            self.reloading = False
+
+    def put(self, entity_id, label):
+        with self.lock:
+            if self.loaded_at is None:
+                return
+            self._drop(entity_id)
+            if label is not None:
+                self.labels[entity_id] = label
+                for key in keys(label[0]):
+                    bisect.insort(self.entries, (key, entity_id))
+
+    def _drop(self, entity_id):
+        label = self.labels.pop(entity_id, None)
+        if label is None:
+            return
+        for key in keys(label[0]):
+            i = bisect.bisect_left(self.entries, (key, entity_id))
+            if i < len(self.entries) and self.entries[i] == (key, entity_id):
+                del self.entries[i]
+
+    def lookup(self, prefix, limit):
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+        if self.loaded_at is None:
+            self.load()
+        elif (not self.reloading and time.monotonic() - self.loaded_at >
+              current_app.config.get('TYPEAHEAD_MAX_AGE', 60)):
+            self.reloading = True
+            jobs.enqueue('reload-typeahead', self.model.__name__)
+        ids = []
+        with self.lock:
+            i = bisect.bisect_left(self.entries, (prefix,))
+            while i < len(self.entries) and len(ids) < limit:
+                key, entity_id = self.entries[i]
+                if not key.startswith(prefix):
+                    break
+                if entity_id not in ids:
+                    ids.append(entity_id)
+                i += 1
+            labels = [self.labels[entity_id] for entity_id in ids]
+        return [{'id': entity_id, 'name': name, 'city': city, 'state': state}
+                for entity_id, (name, city, state) in zip(ids, labels)]
+
+
+INDEXES = {Venue: PrefixIndex(Venue), Artist: PrefixIndex(Artist)}
+MODELS = {model.__name__: model for model in INDEXES}
+
+
+def lookup(model, prefix, limit=10):
+    return INDEXES[model].lookup(prefix, limit)
+
+
+@jobs.job('reload-typeahead')
+def reload(model_name):
+    INDEXES[MODELS[model_name]].load()
+
+
+def _changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('typeahead', []).append(
+            (type(target), target.id, (target.name, target.city, target.state)))
+
+
+def _deleted(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('typeahead', []).append((type(target), target.id, None))
+
+
+def _after_commit(session):
+    for model, entity_id, label in session.info.pop('typeahead', ()):
+        INDEXES[model].put(entity_id, label)
+
+
+def _after_rollback(session):
+    session.info.pop('typeahead', None)
+
+
+for _model in INDEXES:
+    event.listen(_model, 'after_insert', _changed)
+    event.listen(_model, 'after_update', _changed)
+    event.listen(_model, 'after_delete', _deleted)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_rollback', _after_rollback)
@@ -0,0 +1,67 @@
+#----------------------------------------------------------------------------#
+# Warm-up before a worker takes traffic (WARMUP=1).
+#
+# Compiles every Jinja template, configures the mappers and sends each read
+# route one request through the test client. That primes SQLAlchemy's
+# compiled-statement cache with the queries real requests run, and loads
+# the search index where there is one, so the first users of a fresh worker
+# don't pay for all of it. Connections opened here are disposed of
+# afterwards so none are shared with forked workers.
+#----------------------------------------------------------------------------#
+import time
+
+from sqlalchemy.orm import configure_mappers
+
+from models import db, Venue, Artist
+
+
+def read_requests(venue_id, artist_id):
+    """(method, url, form data) for the routes to warm."""
+    requests = [('GET', '/', None),
+                ('GET', '/venues', None),
+                ('GET', '/artists', None),
+                ('GET', '/artists.json', None),
+                ('GET', '/shows', None),
+                ('GET', '/shows/create', None),
+                ('POST', '/venues/search', {'search_term': 'a'}),
+                ('POST', '/artists/search', {'search_term': 'a'}),
+                ('GET', '/api/v1/venues?limit=1', None),
+                ('GET', '/api/v1/artists?limit=1', None),
+                ('GET', '/api/v1/shows?limit=1', None),
+                ('GET', '/api/v1/venues/typeahead?q=a', None),
+                ('GET', '/api/v1/artists/typeahead?q=a', None)]
+    if venue_id is not None:
+        requests += [('GET', '/venues/%d' % venue_id, None),
+                     ('GET', '/api/v1/venues/%d' % venue_id, None)]
+    if artist_id is not None:
+        requests += [('GET', '/artists/%d' % artist_id, None),
+                     ('GET', '/api/v1/artists/%d' % artist_id, None)]
+    return requests
+
+
+def warm(app):
+    started = time.perf_counter()
+    env = app.jinja_env
+    templates = [name for name in env.list_templates() if name.endswith('.html')]
+    for name in templates:
+        env.get_template(name)
+    configure_mappers()
+
+    warmed = 0
+    try:
+        with app.app_context():
+            venue_id = db.session.query(db.func.min(Venue.id)).scalar()
+            artist_id = db.session.query(db.func.min(Artist.id)).scalar()
+            client = app.test_client()
+            for method, url, data in read_requests(venue_id, artist_id):
+                response = client.open(url, method=method, data=data)
+                response.get_data()
+                response.close()
+                warmed += 1
+            db.session.remove()
+            db.engine.dispose()
+    except Exception:
+        # A worker without its database still boots; it just starts cold.
+        app.logger.warning('warm-up stopped after %d requests', warmed, exc_info=True)
+    app.logger.info('warmed %d templates and %d routes in %.0fms', len(templates),
+                    warmed, (time.perf_counter() - started) * 1000)